@@ -8,6 +8,9 @@
 " Setup (import python modules when first called)
 py3 import vim
 py3 import vim_autoimport
+if !empty(get(g:, 'autoimport_trace_log', ''))
+    py3 vim_autoimport.stats.set_trace_log(vim.eval('expand(g:autoimport_trace_log)'))
+endif
 
 if exists('v:false') | let s:false = v:false | else | let s:false = 0 | endif
 if exists('v:true')  | let s:true  = v:true  | else | let s:true  = 1 | endif
@@ -39,3 +42,80 @@ endfunction
 function! autoimport#resolve_import(symbol) abort
     return py3eval('vim_autoimport.get_manager().resolve_import(vim.eval("a:symbol"))')
 endfunction
+
+function! autoimport#resolve_many(symbols) abort
+    " Returns {symbol: [import statements]} for all the given symbols,
+    " where candidates are ranked by preference (never asks user).
+    return py3eval('{k: list(map(str, v)) for (k, v) in '
+                \ . 'vim_autoimport.get_manager().resolve_many(vim.eval("a:symbols")).items()}')
+endfunction
+
+function! autoimport#precompute_imports() abort
+    " Speculatively resolve imports for all the unresolved symbols in the
+    " current buffer. Returns {symbol: {statement, line, usage}}.
+    return py3eval('vim_autoimport.get_manager().precompute_imports()')
+endfunction
+
+function! autoimport#precompute_imports_in_background() abort
+    " Like autoimport#precompute_imports(), but symbols are resolved in a
+    " background thread; see autoimport#collect_precomputed().
+    py3 vim_autoimport.get_manager().precompute_imports_in_background()
+endfunction
+
+function! autoimport#collect_precomputed() abort
+    " Returns {'state': 'running'|'stale'|'done', 'imports': {symbol: ...}}
+    return py3eval('vim_autoimport.get_manager().collect_precomputed()')
+endfunction
+
+function! autoimport#stats() abort
+    " Returns performance statistics (indexes, latency, caches, RPCs) as a dict.
+    return py3eval('vim_autoimport.stats.as_dict()')
+endfunction
+
+function! autoimport#stats_lines() abort
+    return py3eval('vim_autoimport.stats.format_lines()')
+endfunction
+
+function! autoimport#warm_up(...) abort
+    " Build the indexes ahead of the first import (called at idle time).
+    " The filetype is explicit (python by default), as the current buffer
+    " may not be the one that scheduled the warm-up.
+    let l:filetype = get(a:, 1, 'python')
+    py3 vim_autoimport.get_manager(vim.eval('l:filetype')).warm_up()
+endfunction
+
+function! autoimport#reindex() abort
+    " Rebuild the indexes in background (e.g. after installing packages).
+    " In-flight builds are cancelled; the current indexes are used until done.
+    py3 vim_autoimport.get_manager().reindex()
+endfunction
+
+function! autoimport#index_status() abort
+    " Returns {strategy: {'state': 'building'|'ready'|'failed', 'error', 'symbols'}}
+    return py3eval('vim_autoimport.get_manager().index_status()')
+endfunction
+
+function! autoimport#members(qualifier, ...) abort
+    " Returns known members of a package or its alias that start with the
+    " prefix, e.g. autoimport#members('np', 'lin') -> ['linalg', 'linspace']
+    let l:prefix = get(a:, 1, '')
+    return py3eval('vim_autoimport.get_manager().members('
+                \ . 'vim.eval("a:qualifier"), vim.eval("l:prefix"))')
+endfunction
+
+function! autoimport#learn_conventions(...) abort
+    " Learn import conventions (aliases, where symbols are imported from, etc.)
+    " from python files in the given directories (or g:autoimport_convention_paths),
+    " in background. See autoimport#learn_status() for the progress.
+    let l:paths = a:0 ? a:000 : get(g:, 'autoimport_convention_paths', [])
+    let l:workers = get(g:, 'autoimport_convention_workers', 0)
+    py3 import vim_autoimport.conventions
+    py3 vim_autoimport.conventions.learn_in_background(vim.eval("l:paths"),
+                \ workers=int(vim.eval("l:workers")) or None)
+endfunction
+
+function! autoimport#learn_status() abort
+    " Returns {'state': 'learning'|'ready'|'failed', 'error', 'files', 'names'}
+    py3 import vim_autoimport.conventions
+    return py3eval('vim_autoimport.conventions.learn_status()')
+endfunction
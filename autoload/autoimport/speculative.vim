@@ -0,0 +1,103 @@
+" Speculative pre-resolution of unresolved symbols in background.
+"
+" Unresolved symbols are detected and resolved on CursorHold/TextChanged
+" (debounced), so that a later :ImportSymbol only needs to write lines.
+" The results are stored in b:autoimport_pending.
+
+let s:timers = {}
+
+function! autoimport#speculative#schedule() abort
+  if get(b:, 'autoimport_speculative_tick', -1) == b:changedtick
+    return  " up to date
+  endif
+
+  let l:bufnr = bufnr('%')
+  if has_key(s:timers, l:bufnr)
+    call timer_stop(s:timers[l:bufnr])
+  endif
+  let s:timers[l:bufnr] = timer_start(
+        \ get(g:, 'autoimport_speculative_delay', 500),
+        \ {-> s:run(l:bufnr)})
+endfunction
+
+function! s:run(bufnr) abort
+  silent! call remove(s:timers, a:bufnr)
+
+  " Only the current buffer can be processed; otherwise (or in the middle of
+  " insert mode, etc.) try again on the next event.
+  if bufnr('%') != a:bufnr || mode() !=# 'n'
+    return
+  endif
+
+  " Symbols are resolved in a background thread; poll for the result.
+  let l:changedtick = b:changedtick
+  try
+    call autoimport#precompute_imports_in_background()
+  catch
+    return  " e.g. not supported filetype, etc.
+  endtry
+  let s:timers[a:bufnr] = timer_start(20,
+        \ {timer -> s:collect(timer, a:bufnr, l:changedtick)}, {'repeat': -1})
+endfunction
+
+function! s:collect(timer, bufnr, changedtick) abort
+  " Line numbers are determined on the current buffer; if it is not anymore,
+  " give up (scheduled again on the next event in the buffer).
+  if bufnr('%') != a:bufnr
+    call timer_stop(a:timer)
+    silent! call remove(s:timers, a:bufnr)
+    return
+  endif
+  try
+    let l:ret = autoimport#collect_precomputed()
+  catch
+    let l:ret = {'state': 'stale'}
+  endtry
+  if l:ret['state'] ==# 'running'
+    return
+  endif
+  call timer_stop(a:timer)
+  silent! call remove(s:timers, a:bufnr)
+  if l:ret['state'] !=# 'done'
+    return  " the buffer has changed; scheduled again by TextChanged
+  endif
+
+  let l:pending = l:ret['imports']
+  let b:autoimport_pending = l:pending
+  let b:autoimport_speculative_tick = a:changedtick
+
+  call s:publish(a:bufnr, l:pending)
+  if exists('#User#AutoImportPending')
+    doautocmd <nomodeline> User AutoImportPending
+  endif
+endfunction
+
+function! s:publish(bufnr, pending) abort
+  " Show the pending imports as virtual texts where symbols are used.
+  if !has('nvim-0.5') || !get(g:, 'autoimport_speculative_virtual_text', 1)
+    return
+  endif
+  let l:ns = nvim_create_namespace('autoimport_speculative')
+  call nvim_buf_clear_namespace(a:bufnr, l:ns, 0, -1)
+  for l:entry in values(a:pending)
+    call nvim_buf_set_extmark(a:bufnr, l:ns, l:entry['usage'] - 1, 0,
+          \ {'virt_text': [[l:entry['statement'], 'Comment']]})
+  endfor
+endfunction
+
+function! autoimport#speculative#accept_all() abort
+  " Add all the pending imports for the current buffer. The precomputed line
+  " numbers are kept valid after each insertion, so none is resolved again.
+  let l:added = []
+  for l:symbol in sort(keys(get(b:, 'autoimport_pending', {})))
+    let l:ret = autoimport#import_symbol(l:symbol)
+    if !empty(l:ret) && l:ret['line'] > 0
+      call add(l:added, l:ret['statement'])
+    endif
+  endfor
+  let b:autoimport_pending = {}
+  if has('nvim-0.5')
+    call nvim_buf_clear_namespace(0, nvim_create_namespace('autoimport_speculative'), 0, -1)
+  endif
+  return l:added
+endfunction
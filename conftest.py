@@ -1,8 +1,39 @@
 # During unit test, the vim module might not be present.
 # Therefore we should mock vim module before importing any packages.
 import sys
+from pathlib import Path
 sys.modules['vim'] = type(sys)('vim')
 
+# test/ has helpers for tests (e.g. fakevim)
+sys.path.insert(0, str(Path(__file__).parent / 'test'))
+
+import pytest
+
 
 def pytest_addoption(parser):
     parser.addoption("--all", action="store_true", help="run slow tests")
+
+
+@pytest.fixture
+def fake_vim(monkeypatch):
+    """A fake vim (see test/fakevim.py) with an in-memory buffer, that records
+    all the host calls (RPCs) made by vim_autoimport."""
+    import fakevim
+    from vim_autoimport import vim_utils
+
+    vim = fakevim.FakeVim()
+    # vim_utils.host (which records RPCs in stats) delegates to vim_utils.vim
+    monkeypatch.setattr(vim_utils, 'vim', vim)
+    return vim
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path_factory, monkeypatch):
+    """Do not read (or write) user's cache, e.g. learned import conventions,
+    nor share indexes between tests."""
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path_factory.mktemp('cache')))
+    from vim_autoimport import conventions
+    from vim_autoimport.managers import python
+    monkeypatch.setattr(conventions, '_TABLE', None)
+    monkeypatch.setattr(conventions, '_LEARNING', None)
+    monkeypatch.setattr(python, '_BUILDS', {})   # indexes shared by managers
@@ -35,3 +35,85 @@ function s:ImportSymbol(...) abort
     echohl Normal | echom printf("Import `%s` already exists, no changes", l:ret['statement']) | echohl None
   endif
 endfunction
+
+command! -bar ImportPending   call s:ImportPending()
+function s:ImportPending() abort
+  let l:added = autoimport#speculative#accept_all()
+  if empty(l:added)
+    echohl WarningMsg | echom "No pending imports" | echohl None
+  else
+    echohl Special | echom printf("Added %d imports: %s", len(l:added), join(l:added, ', ')) | echohl None
+  endif
+endfunction
+
+command! -bar AutoImportStats   call s:AutoImportStats()
+function s:AutoImportStats() abort
+  for l:line in autoimport#stats_lines()
+    if l:line =~# '^\S'
+      echohl Title | echo l:line | echohl None
+    else
+      echo l:line
+    endif
+  endfor
+endfunction
+
+command! -bar AutoImportReindex   call s:AutoImportReindex()
+function s:AutoImportReindex() abort
+  call autoimport#reindex()
+  for [l:name, l:status] in items(autoimport#index_status())
+    echom printf("%s: %s%s", l:name, l:status['state'],
+          \ empty(l:status['error']) ? '' : ' (last error: ' . l:status['error'] . ')')
+  endfor
+endfunction
+
+command! -bar -nargs=* -complete=dir AutoImportLearn   call s:AutoImportLearn(<f-args>)
+function s:AutoImportLearn(...) abort
+  if a:0 == 0 && empty(get(g:, 'autoimport_convention_paths', []))
+    echohl WarningMsg | echom "Usage: AutoImportLearn [directories] (or set g:autoimport_convention_paths)" | echohl None
+    return
+  endif
+  call call('autoimport#learn_conventions', a:000)
+  echom "Learning import conventions in background..."
+  if exists('*timer_start')
+    call timer_start(500, function('s:AutoImportLearnDone'), {'repeat': -1})
+  endif
+endfunction
+
+function s:AutoImportLearnDone(timer) abort
+  let l:ret = autoimport#learn_status()
+  if l:ret['state'] ==# 'learning'
+    return
+  endif
+  call timer_stop(a:timer)
+  if l:ret['state'] ==# 'ready'
+    echohl Special | echom printf("Learned import conventions for %d names from %d files",
+          \ l:ret['names'], l:ret['files']) | echohl None
+  else
+    echohl WarningMsg | echom "Cannot learn import conventions: " . l:ret['error'] | echohl None
+  endif
+endfunction
+
+
+" Build the indexes shortly after the first python buffer is opened, rather than
+" at startup or on the first import (opt-out with g:autoimport_warmup = 0).
+if get(g:, 'autoimport_warmup', 1) && exists('*timer_start')
+  augroup autoimport_warmup
+    autocmd!
+    autocmd FileType python call s:ScheduleWarmUp()
+  augroup END
+endif
+
+function s:ScheduleWarmUp() abort
+  autocmd! autoimport_warmup
+  call timer_start(get(g:, 'autoimport_warmup_delay', 100), {-> autoimport#warm_up('python')})
+endfunction
+
+
+" Speculative pre-resolution of unresolved symbols (opt-in).
+if get(g:, 'autoimport_speculative', 0)
+  augroup autoimport_speculative
+    autocmd!
+    autocmd CursorHold,TextChanged *
+          \ if &filetype ==# 'python' | call autoimport#speculative#schedule() | endif
+  augroup END
+endif
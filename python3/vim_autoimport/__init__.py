@@ -16,4 +16,16 @@ def __reload__(verbose=False):
     return mods
 
 
-from .managers import get_manager
+# Submodules are imported lazily (PEP 562), so that `import vim_autoimport`
+# (e.g. when autoload/autoimport.vim is sourced) costs almost nothing.
+_LAZY_SUBMODULES = ('stats', 'conventions', 'introspect', 'managers', 'vim_utils')
+
+
+def __getattr__(name):
+    import importlib
+    if name == 'get_manager':
+        return importlib.import_module('.managers', __name__).get_manager
+    if name in _LAZY_SUBMODULES:
+        return importlib.import_module('.' + name, __name__)
+    raise AttributeError("module {!r} has no attribute {!r}".format(
+        __name__, name))
@@ -0,0 +1,151 @@
+"""Import conventions learned from the user's own codebases.
+
+Existing import statements in a set of repositories (`g:autoimport_convention_paths`)
+are counted by the name they bind, e.g. how often `np` is bound by
+`import numpy as np`, or `John` by `from names.Doe import John`, together with
+whether each module is usually imported with `from ... import` or plain
+`import`. The frequency table is persisted on disk (in `~/.cache/vim-autoimport`)
+and used to rank candidates, picking the dominant one without asking the user.
+"""
+
+import json
+import os
+import subprocess
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from . import stats
+from .mining import ConventionTable, mine_files, mine_source  # noqa: F401
+from .vim_utils import default_cache_path
+
+# Directories that are not part of the user's code
+EXCLUDE_DIRS = {'__pycache__', 'node_modules', 'site-packages', 'build', 'dist'}
+
+
+def find_sources(paths: Iterable[str], max_files: int = 50000) -> List[str]:
+    """Find python files in the directories, excluding virtualenvs etc."""
+    filenames: List[str] = []
+    for path in paths:
+        path = os.path.expanduser(path)
+        if os.path.isfile(path):
+            filenames.append(path)
+            continue
+        for dirpath, dirnames, files in os.walk(path):
+            if 'pyvenv.cfg' in files:
+                dirnames[:] = []  # a virtualenv
+                continue
+            dirnames[:] = [d for d in dirnames if not d.startswith('.')
+                           and d not in EXCLUDE_DIRS]
+            filenames.extend(os.path.join(dirpath, f) for f in files
+                             if f.endswith('.py'))
+            if len(filenames) >= max_files:
+                return filenames[:max_files]
+    return filenames
+
+
+def _mine_in_subprocess(filenames: List[str]) -> ConventionTable:
+    """Run mine_files() in a python subprocess (see mining.py), as introspect.py
+    does: forking the editor's host (from a background thread) may deadlock,
+    and the editor itself cannot be spawned as a python worker."""
+    from . import introspect
+    # only this package is needed, which does not depend on `vim` for mining
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=package_root)
+    try:
+        proc = subprocess.run(
+            [introspect.python_executable(), '-m', 'vim_autoimport.mining'],
+            input=json.dumps(filenames).encode('utf-8'),
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+    except FileNotFoundError:
+        return mine_files(filenames)   # no python interpreter; in this thread
+    if proc.returncode != 0:
+        message = proc.stderr.decode('utf-8', errors='ignore').strip()
+        raise RuntimeError("Mining worker failed (exit code {}): {}".format(
+            proc.returncode, message.split('\n')[-1]))
+    return ConventionTable.from_dict(json.loads(proc.stdout.decode('utf-8')))
+
+
+def learn(paths: Iterable[str], workers: Optional[int] = None,
+          path: Optional[str] = None, chunk_size: int = 1000) -> ConventionTable:
+    """Learn import conventions from the python files in the directories with
+    parallel worker processes, and persist the table (replacing the old one)."""
+    import concurrent.futures
+    t0 = time.perf_counter()
+    filenames = find_sources(paths)
+    chunks = [filenames[i:i + chunk_size]
+              for i in range(0, len(filenames), chunk_size)]
+    table = ConventionTable()
+    if chunks:
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=workers or os.cpu_count()) as pool:
+            for result in pool.map(_mine_in_subprocess, chunks):
+                table.merge(result)
+
+    table.save(path or default_cache_path('conventions.json'))
+    set_table(table)
+    stats.record_index('conventions', build_time=time.perf_counter() - t0,
+                       symbols=len(table), memory=stats.estimate_size(table.names))
+    return table
+
+
+# The learning in progress (or done) in background, see learn_in_background().
+_LEARNING: Optional['concurrent.futures.Future[ConventionTable]'] = None
+_LEARNING_LOCK = threading.Lock()
+
+
+def learn_in_background(paths: Iterable[str], workers: Optional[int] = None,
+                        path: Optional[str] = None,
+                        ) -> 'concurrent.futures.Future[ConventionTable]':
+    """Run learn() in a background thread without blocking the editor.
+    If one is already in progress, it is returned instead (processes cannot
+    be cancelled safely)."""
+    import concurrent.futures
+    global _LEARNING
+    with _LEARNING_LOCK:
+        if _LEARNING is not None and not _LEARNING.done():
+            return _LEARNING   # coalesce
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='autoimport-learn')
+        _LEARNING = executor.submit(learn, list(paths), workers, path)
+        executor.shutdown(wait=False)
+        return _LEARNING
+
+
+def learn_status() -> Dict[str, Any]:
+    """The status of learn_in_background(): 'learning', 'ready', 'failed'
+    (or 'not started'), with the number of files and names learned."""
+    future = _LEARNING
+    if future is None:
+        return {'state': 'not started', 'error': None, 'files': 0, 'names': 0}
+    if not future.done():
+        return {'state': 'learning', 'error': None, 'files': 0, 'names': 0}
+    error = future.exception()
+    if error is not None:
+        return {'state': 'failed', 'error': str(error) or type(error).__name__,
+                'files': 0, 'names': 0}
+    table = future.result()
+    return {'state': 'ready', 'error': None, 'files': table.files,
+            'names': len(table)}
+
+
+# The learned table (loaded lazily from the disk). It is replaced as a whole
+# and never mutated once published, so it can be read without locking.
+_TABLE: Optional[ConventionTable] = None
+_TABLE_LOCK = threading.Lock()
+
+
+def get_table() -> ConventionTable:
+    global _TABLE
+    table = _TABLE
+    if table is None:
+        with _TABLE_LOCK:
+            if _TABLE is None:
+                _TABLE = ConventionTable.load(default_cache_path('conventions.json'))
+            table = _TABLE
+    return table
+
+
+def set_table(table: ConventionTable):
+    global _TABLE
+    _TABLE = table
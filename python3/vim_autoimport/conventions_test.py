@@ -0,0 +1,117 @@
+import sys
+
+import pytest
+
+from vim_autoimport import conventions
+
+
+SOURCE = '''
+from __future__ import annotations
+import numpy as np
+import os.path
+from names.Doe import John
+from . import local
+from .local import helper
+from typing import *
+
+def f():
+    import numpy as np
+    from names.Lennon import John as Lennon
+'''
+
+
+def testMineSource():
+    table = conventions.ConventionTable()
+    conventions.mine_source(SOURCE, table)
+    assert dict(table.names) == {
+        'np': {'import numpy as np': 2},
+        'os.path': {'import os.path': 1},
+        'John': {'from names.Doe import John': 1},
+        'Lennon': {'from names.Lennon import John as Lennon': 1},
+    }
+    assert table.styles['numpy'] == {'import': 2}
+    assert table.styles['names.Doe'] == {'from': 1}
+
+    # invalid sources are ignored
+    conventions.mine_source('import (', table)
+
+
+def testDominant():
+    table = conventions.ConventionTable()
+    for _ in range(9):
+        table.add('John', 'from names.Doe import John', 'names.Doe', 'from')
+    table.add('John', 'from names.Lennon import John', 'names.Lennon', 'from')
+    table.add('Paul', 'from names.McCartney import Paul', 'names.McCartney', 'from')
+    table.add('Paul', 'from names.Smith import Paul', 'names.Smith', 'from')
+
+    assert table.dominant('John') == 'from names.Doe import John'
+    assert table.dominant('John', ['from names.Lennon import John',
+                                   'from names.Doe import John']) == \
+        'from names.Doe import John'
+    assert table.dominant('John', ['from names.Lennon import John']) is None  # too few
+    assert table.dominant('Paul') is None  # not dominant
+    assert table.dominant('George') is None
+
+    # rank by counts, and then by the import style of the module
+    table.add('Ringo', 'from names.Doe import Ringo', 'names.Doe', 'from')
+    assert table.rank('Paul', ['from names.Unknown import Paul',
+                               'from names.Doe import Paul',
+                               'from names.Smith import Paul']) == \
+        ['from names.Smith import Paul', 'from names.Doe import Paul',
+         'from names.Unknown import Paul']
+
+
+def testMineInSubprocess(tmp_path, mocker):
+    """Files are mined by a worker, which runs without vim (see mining.py)."""
+    (tmp_path / 'main.py').write_text(SOURCE)
+    mocker.patch.object(conventions, 'mine_files', side_effect=AssertionError)
+    table = conventions._mine_in_subprocess([str(tmp_path / 'main.py')])
+    assert table.files == 1
+    assert table.names['np'] == {'import numpy as np': 2}
+    assert table.styles['names.Doe'] == {'from': 1}
+
+
+def testLearn(tmp_path, monkeypatch):
+    # workers are plain python subprocesses; the editor's host is never forked
+    monkeypatch.setattr('os.fork', None)
+    for i in range(3):
+        (tmp_path / 'repo{}'.format(i)).mkdir()
+        (tmp_path / 'repo{}'.format(i) / 'main.py').write_text(SOURCE)
+    (tmp_path / 'repo0' / '.venv').mkdir()
+    (tmp_path / 'repo0' / '.venv' / 'lib.py').write_text('import numpy as npy\n')
+
+    cache_path = str(tmp_path / 'conventions.json')
+    table = conventions.learn([str(tmp_path)], workers=2, path=cache_path,
+                              chunk_size=2)
+    assert table.files == 3
+    assert table.names['np'] == {'import numpy as np': 6}
+    assert conventions.get_table() is table
+
+    # persisted
+    loaded = conventions.ConventionTable.load(cache_path)
+    assert loaded.names == table.names
+    assert loaded.styles == table.styles
+    assert loaded.dominant('John') == 'from names.Doe import John'
+
+
+@pytest.mark.timeout(10.0)
+def testLearnInBackground(tmp_path):
+    (tmp_path / 'main.py').write_text(SOURCE)
+    assert conventions.learn_status()['state'] == 'not started'
+    future = conventions.learn_in_background(
+        [str(tmp_path)], workers=1, path=str(tmp_path / 'conventions.json'))
+    assert conventions.learn_status()['state'] in ('learning', 'ready')
+    table = future.result(timeout=5.0)
+    assert conventions.get_table() is table
+    assert conventions.learn_status() == {
+        'state': 'ready', 'error': None, 'files': 1, 'names': len(table)}
+
+    future = conventions.learn_in_background(
+        [str(tmp_path)], path=str(tmp_path / 'nonexistent' / '\0'))
+    with pytest.raises(ValueError):
+        future.result(timeout=5.0)
+    assert conventions.learn_status()['state'] == 'failed'
+
+
+if __name__ == '__main__':
+    pytest.main(["-s", "-v"] + sys.argv)
@@ -0,0 +1,200 @@
+"""Sandboxed introspection of compiled (extension) modules.
+
+Modules that ship neither python sources nor stubs can only be learned by
+importing them. To keep heavy or crashing imports away from the editor host,
+each module is imported in a disposable subprocess with a timeout and a memory
+limit, and the public names (__all__ or dir()) are cached on disk per version
+of the distribution, so that each module is introspected only once.
+"""
+
+import importlib.machinery
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+from typing import Dict, List, Optional
+
+from . import stats
+from .vim_utils import default_cache_path
+
+
+# The script run by worker subprocesses: argv = [module, memory_limit_bytes]
+_WORKER_SCRIPT = r'''
+import importlib, json, sys
+try:
+    import resource
+    limit = int(sys.argv[2])
+    if limit > 0:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+except (ImportError, ValueError, OSError):
+    pass  # e.g. windows
+module = importlib.import_module(sys.argv[1])
+names = getattr(module, '__all__', None)
+if names is None:
+    names = [s for s in dir(module) if not s.startswith('_')]
+json.dump(sorted(set(map(str, names))), sys.stdout)
+'''
+
+
+class IntrospectionError(RuntimeError):
+    pass
+
+
+def python_executable() -> str:
+    """The python interpreter to run workers; note that sys.executable can be
+    the editor itself (e.g. vim) rather than python."""
+    if os.path.basename(sys.executable).startswith('python'):
+        return sys.executable
+    return shutil.which('python3') or shutil.which('python') or 'python3'
+
+
+def introspect(module: str, timeout: float = 10.0,
+               memory_limit: int = 2 << 30) -> List[str]:
+    """Import the module in a subprocess and get its public names.
+    Raises IntrospectionError if the import fails, crashes, or times out."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in sys.path if p))
+    try:
+        proc = subprocess.run(
+            [python_executable(), '-c', _WORKER_SCRIPT, module, str(memory_limit)],
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE, timeout=timeout, env=env)
+    except subprocess.TimeoutExpired:
+        raise IntrospectionError("Timeout ({}s) while importing {}".format(
+            timeout, module))
+    if proc.returncode != 0:
+        message = proc.stderr.decode('utf-8', errors='ignore').strip()
+        raise IntrospectionError("Cannot import {} (exit code {}): {}".format(
+            module, proc.returncode, message.split('\n')[-1]))
+    return json.loads(proc.stdout.decode('utf-8'))
+
+
+def _distribution_versions() -> Dict[str, str]:
+    """top-level module name -> 'distribution==version'"""
+    try:
+        import importlib.metadata as metadata
+        packages = metadata.packages_distributions()  # python 3.10+
+    except (ImportError, AttributeError):
+        return {}
+    versions = {}
+    for top, dists in packages.items():
+        try:
+            versions[top] = '{}=={}'.format(dists[0], metadata.version(dists[0]))
+        except Exception:
+            pass
+    return versions
+
+
+class IntrospectionCache:
+    """Public names of modules, persisted as JSON and keyed by
+    `module@distribution==version` (or mtime of the module file if it does
+    not belong to any distribution). Failures are cached as well."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or default_cache_path('introspect.json')
+        self._lock = threading.Lock()
+        self._versions: Optional[Dict[str, str]] = None
+        try:
+            with open(self.path) as f:
+                self._entries: Dict[str, Dict] = json.load(f)
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def key(self, module: str, filename: Optional[str] = None) -> str:
+        if self._versions is None:
+            self._versions = _distribution_versions()
+        version = self._versions.get(module.partition('.')[0])
+        if not version and filename:
+            try:
+                version = 'mtime={}'.format(int(os.path.getmtime(filename)))
+            except OSError:
+                pass
+        return '{}@{}'.format(module, version or 'unknown')
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            return self._entries.get(key)
+
+    def put(self, key: str, names: Optional[List[str]],
+            error: Optional[str] = None):
+        with self._lock:
+            self._entries[key] = {'names': names or [], 'error': error}
+
+    def save(self):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(self._entries, f)
+            os.replace(tmp, self.path)   # atomic
+
+
+def find_compiled_modules(directory: str) -> Dict[str, str]:
+    """Find public extension modules under the directory (e.g. site-packages)
+    that have neither python sources nor stubs. Returns {module: filename}."""
+    suffixes = sorted(importlib.machinery.EXTENSION_SUFFIXES, key=len,
+                      reverse=True)
+    modules: Dict[str, str] = {}
+    for dirpath, dirnames, filenames in os.walk(directory):
+        relpath = os.path.relpath(dirpath, directory)
+        parts = [] if relpath == '.' else relpath.split(os.sep)
+        # only public, importable packages (and no stubs, tests, etc.)
+        dirnames[:] = [d for d in dirnames if d.isidentifier()
+                       and not d.startswith('_') and d not in ('tests', 'test')]
+        if parts and not any(f.startswith('__init__.') for f in filenames):
+            dirnames[:] = []
+            continue
+        stems = set(os.path.splitext(f)[0] for f in filenames
+                    if f.endswith(('.py', '.pyi')))
+        for f in filenames:
+            suffix = next((s for s in suffixes if f.endswith(s)), None)
+            if not suffix:
+                continue
+            stem = f[:-len(suffix)]
+            if stem in stems or not stem.isidentifier():
+                continue  # has sources or stubs
+            if stem == '__init__':
+                module = '.'.join(parts)
+            elif stem.startswith('_'):
+                continue  # private
+            else:
+                module = '.'.join(parts + [stem])
+            if module:
+                modules[module] = os.path.join(dirpath, f)
+    return modules
+
+
+def introspect_many(modules: Dict[str, Optional[str]],
+                    cache: Optional[IntrospectionCache] = None,
+                    workers: int = 4, timeout: float = 10.0,
+                    memory_limit: int = 2 << 30) -> Dict[str, List[str]]:
+    """Introspect modules ({module: filename}) in a pool of subprocesses,
+    using (and updating) the cache. Failed modules are omitted."""
+    result: Dict[str, List[str]] = {}
+    todo: Dict[str, str] = {}   # module -> cache key
+    for module, filename in modules.items():
+        key = cache.key(module, filename) if cache else module
+        entry = cache.get(key) if cache else None
+        if cache:
+            stats.cache_access('introspection', hit=entry is not None)
+        if entry is None:
+            todo[module] = key
+        elif not entry.get('error'):
+            result[module] = entry['names']
+
+    if todo:
+        import concurrent.futures
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(introspect, module, timeout, memory_limit): module
+                       for module in todo}
+            for future in concurrent.futures.as_completed(futures):
+                module = futures[future]
+                try:
+                    result[module] = future.result()
+                    if cache: cache.put(todo[module], result[module])
+                except IntrospectionError as e:
+                    if cache: cache.put(todo[module], None, error=str(e))
+        if cache:
+            cache.save()
+    return result
@@ -0,0 +1,79 @@
+import importlib.machinery
+import sys
+
+import pytest
+
+from vim_autoimport import introspect
+
+
+@pytest.fixture
+def modules_dir(tmp_path, monkeypatch):
+    """A directory on sys.path with modules that are slow, crashing, etc."""
+    (tmp_path / 'goodmod.py').write_text(
+        'import os\n__all__ = ["foo", "Bar"]\ndef foo(): pass\nclass Bar: pass\n')
+    (tmp_path / 'noallmod.py').write_text(
+        'import os\ndef foo(): pass\n_private = 1\n')
+    (tmp_path / 'slowmod.py').write_text('import time\ntime.sleep(30)\n')
+    (tmp_path / 'crashmod.py').write_text('import os\nos.abort()\n')
+    (tmp_path / 'errormod.py').write_text('raise ImportError("oops")\n')
+    (tmp_path / 'hogmod.py').write_text('x = bytearray(1 << 30)\n')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    return tmp_path
+
+
+def testIntrospect(modules_dir):
+    assert introspect.introspect('goodmod') == ['Bar', 'foo']
+    assert introspect.introspect('noallmod') == ['foo', 'os']
+
+    with pytest.raises(introspect.IntrospectionError, match='Timeout'):
+        introspect.introspect('slowmod', timeout=1.0)
+    with pytest.raises(introspect.IntrospectionError, match='exit code'):
+        introspect.introspect('crashmod')
+    with pytest.raises(introspect.IntrospectionError, match='oops'):
+        introspect.introspect('errormod')
+    if sys.platform.startswith('linux'):
+        with pytest.raises(introspect.IntrospectionError, match='MemoryError'):
+            introspect.introspect('hogmod', memory_limit=256 << 20)
+
+
+def testIntrospectManyCached(modules_dir, tmp_path, mocker):
+    cache = introspect.IntrospectionCache(str(tmp_path / 'cache.json'))
+    spy = mocker.spy(introspect, 'introspect')
+
+    modules = {'goodmod': str(modules_dir / 'goodmod.py'),
+               'errormod': str(modules_dir / 'errormod.py')}
+    assert introspect.introspect_many(modules, cache=cache) == \
+        {'goodmod': ['Bar', 'foo']}
+    assert spy.call_count == 2
+
+    # introspected only once, even for failures
+    cache = introspect.IntrospectionCache(str(tmp_path / 'cache.json'))
+    assert introspect.introspect_many(modules, cache=cache) == \
+        {'goodmod': ['Bar', 'foo']}
+    assert spy.call_count == 2
+
+
+def testFindCompiledModules(tmp_path):
+    so = importlib.machinery.EXTENSION_SUFFIXES[0]
+    files = [
+        'fastlib' + so,                           # compiled, no source/stub
+        'stubbed' + so, 'stubbed.pyi',            # has stubs
+        '_private' + so,                          # private
+        'pkg/__init__.py', 'pkg/speedups' + so,   # compiled submodule
+        'pkg/_impl' + so,
+        'pkg/sourced' + so, 'pkg/sourced.py',
+        'cpkg/__init__' + so,                     # compiled package
+        'notapkg/orphan' + so,                    # not importable
+        'pkg-1.0.dist-info/RECORD',
+    ]
+    for f in files:
+        (tmp_path / f).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / f).write_text('')
+
+    modules = introspect.find_compiled_modules(str(tmp_path))
+    assert sorted(modules) == ['cpkg', 'fastlib', 'pkg.speedups']
+    assert modules['fastlib'] == str(tmp_path / ('fastlib' + so))
+
+
+if __name__ == '__main__':
+    pytest.main(["-s", "-v"] + sys.argv)
@@ -1,12 +1,15 @@
-import vim
+import threading
 from typing import Optional, Dict
 
+from ..vim_utils import host as vim
 from .manager import AutoImportManager as AutoImportManager
 from .manager import StrategyNotReadyError as StrategyNotReadyError
+from .manager import StrategyFailedError as StrategyFailedError
 
 
 # A cache for singleton manager instances (one per filetype)
 INSTANCES: Dict[str, AutoImportManager] = {}
+_INSTANCES_LOCK = threading.Lock()
 
 
 def get_manager(filetype: Optional[str] = None,
@@ -22,16 +25,20 @@ def get_manager(filetype: Optional[str] = None,
     if not filetype:
         raise ValueError("Unknown filetype.")
 
-    # TODO: use a thread lock.
     manager = INSTANCES.get(filetype, None)
     if manager is not None:
-        return manager
+        return manager   # fast path, without locking
+
+    with _INSTANCES_LOCK:
+        manager = INSTANCES.get(filetype, None)
+        if manager is not None:
+            return manager   # created by another thread meanwhile
 
-    if filetype == 'python':
-        from .python import PythonImportManager
-        manager = PythonImportManager()
-    else:
-        raise NotImplementedError("Sorry, currently only python is supported.")
+        if filetype == 'python':
+            from .python import PythonImportManager
+            manager = PythonImportManager()
+        else:
+            raise NotImplementedError("Sorry, currently only python is supported.")
 
-    INSTANCES[filetype] = manager
-    return manager
+        INSTANCES[filetype] = manager
+        return manager
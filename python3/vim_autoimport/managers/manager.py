@@ -6,9 +6,9 @@ from typing import Set
 from typing import Any, Dict, Optional, List, Tuple, Iterable
 from abc import ABC, abstractmethod
 
-import vim
-
+from .. import stats
 from ..vim_utils import funcref, is_treesitter_supported
+from ..vim_utils import host as vim   # records RPCs
 
 
 LineNumber = int     # 1-indexed line number as integer.
@@ -18,11 +18,48 @@ class StrategyNotReadyError(RuntimeError):
     pass
 
 
+class StrategyFailedError(StrategyNotReadyError):
+    """The index could not be built (e.g. ctags crashed); unlike still being
+    built, it will not become ready until reindexed."""
+
+
+# Get the treesitter captures at the first column of each of the given rows
+# (0-indexed) for the current buffer, in a single RPC.
+_LUA_TREESITTER_CAPTURES = '''
+local rows, result = ..., {}
+for i, row in ipairs(rows) do
+  local names = {}
+  for _, t in ipairs(vim.treesitter.get_captures_at_pos(0, row, 0)) do
+    table.insert(names, t.capture)
+  end
+  result[i] = names
+end
+return result
+'''
+
+
+_EXECUTOR = None
+
+
+def _background_executor():
+    '''A thread to resolve imports in background (created on the first use).'''
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        import concurrent.futures
+        _EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='autoimport-precompute')
+    return _EXECUTOR
+
+
 class AutoImportManager(ABC):
     # TODO: Define life-cycle or reusability of Manager classes.
 
     def __init__(self):
-        pass
+        # Speculatively precomputed imports for each buffer, which are valid
+        # only for the changedtick: bufnr -> (changedtick, {symbol: entry})
+        self._precomputed: Dict[int, Tuple[int, Dict[str, Dict[str, Any]]]] = {}
+        # Precomputations in progress: bufnr -> (changedtick, lines, future)
+        self._in_progress: Dict[int, Tuple[int, List[str], Any]] = {}
 
     @abstractmethod
     def resolve_import(self, symbol: str) -> Optional[str]:
@@ -30,6 +67,40 @@ class AutoImportManager(ABC):
         If not resolvable, return None.'''
         raise NotImplementedError
 
+    @abstractmethod
+    def resolve_many(self, symbols: Iterable[str]) -> Dict[str, List[Any]]:
+        '''Resolve all the import candidates for each of the given symbols,
+        without any user interaction (e.g. asking to choose one).
+        Candidates are ranked by preference; if not resolvable, the symbol
+        is mapped to an empty list.'''
+        raise NotImplementedError
+
+    def resolve_unambiguous(self, symbol: str) -> Optional[str]:
+        '''Resolve a import statement for the given symbol, like
+        resolve_import(), but without any user interaction. If ambiguous
+        (i.e. user would be asked to choose one) or not resolvable, return None.'''
+        return None
+
+    def find_unresolved_symbols(self, lines: List[str],
+                                ) -> List[Tuple[str, LineNumber]]:
+        '''Find (approximately) the symbols that are used but not defined
+        or imported in the given source lines, along with the line number
+        where each symbol is used for the first time.'''
+        return []
+
+    def warm_up(self) -> None:
+        '''Build the indexes ahead of the first query, e.g. at idle time.'''
+        pass
+
+    def reindex(self) -> None:
+        '''Rebuild the indexes (e.g. after installing packages) in background.
+        The current indexes are used until new ones are built.'''
+        pass
+
+    def index_status(self) -> Dict[str, Dict[str, Any]]:
+        '''The status of each index, e.g. {'state': 'building', ...}.'''
+        return {}
+
     @abstractmethod
     def is_import_statement(self, line: str) -> bool:
         '''Tells whether the given line is a import statement.'''
@@ -44,25 +115,162 @@ class AutoImportManager(ABC):
     def _get_hlgroups_at_line(self, line_nr: LineNumber) -> Set[str]:
         '''Get all the names of syntax groups in the given line (1-indexed),
         for the current buffer.'''
+        return self._get_hlgroups_at_lines([line_nr])[0]
+
+    def _get_hlgroups_at_lines(self, line_nrs: List[LineNumber],
+                               ) -> List[Set[str]]:
+        '''Batched version of _get_hlgroups_at_line(), which takes a constant
+        number of RPCs regardless of the number of lines.'''
+        if not line_nrs:
+            return []
 
         # Vanilla vim syntax
-        synid = funcref('synID')(line_nr, 1, 1)  # lnum, col, trans
-        syntaxgroup = funcref('synIDattr')(synid, 'name')
-        if syntaxgroup:
-            return set([syntaxgroup])
+        syntaxgroups = funcref('map')(
+            list(line_nrs), 'synIDattr(synID(v:val, 1, 1), "name")')
+        result: List[Set[str]] = [
+            set([g.decode('utf8') if isinstance(g, bytes) else g]) if g else set()
+            for g in syntaxgroups]
 
         # treesitter (requires nvim 0.9.0+)
-        if is_treesitter_supported:
+        missing = [i for i, groups in enumerate(result) if not groups]
+        if is_treesitter_supported and missing:
             # treesitter hlgroups are prefixed with '@' like a capture
-            captures = vim.lua.vim.treesitter.get_captures_at_pos(0, line_nr - 1, 0)
-            if captures:
-                return set('@' + t['capture'] for t in captures)
+            captures = vim.exec_lua(_LUA_TREESITTER_CAPTURES,
+                                    [line_nrs[i] - 1 for i in missing])
+            for i, names in zip(missing, captures):
+                result[i] = set('@' + name for name in names)
 
         # TODO: Support non-treesitter extmark highlights (e.g. semshi)
-        return set()  # not found
+        return result
+
+    def determine_linenumbers(self, import_statements: List[str],
+                              lines: List[str]) -> List[LineNumber]:
+        '''Batched version of determine_linenumber() for the given lines of
+        the current buffer (already fetched), e.g. to precompute imports.'''
+        del lines
+        return [self.determine_linenumber(s) for s in import_statements]
+
+    @stats.timed('precompute_imports')
+    def precompute_imports(self) -> Dict[str, Dict[str, Any]]:
+        '''Speculatively resolve the imports for all the unresolved symbols in
+        the current buffer, and the line numbers at which they will be placed.
+
+        The result is stored for the current buffer (until it changes), so
+        that import_symbol() afterwards only needs to write lines.
+        Returns {symbol: {'statement', 'line', 'usage'}}, where 'usage' is the
+        line number the symbol is used for the first time.
+        '''
+        buf = vim.current.buffer
+        changedtick = funcref('getbufvar')('%', 'changedtick')
+        lines: List[str] = buf[:]
+        return self._store_precomputed(buf.number, changedtick, lines,
+                                       self._resolve_unresolved(lines))
+
+    def precompute_imports_in_background(self) -> None:
+        '''Start precompute_imports() for the current buffer, where symbols are
+        resolved in a background thread so as not to block the UI. The result
+        is collected by collect_precomputed() on the main thread.'''
+        buf = vim.current.buffer
+        changedtick = funcref('getbufvar')('%', 'changedtick')
+        lines: List[str] = buf[:]
+        future = _background_executor().submit(self._resolve_unresolved, lines)
+        self._in_progress[buf.number] = (changedtick, lines, future)
+
+    @stats.timed('collect_precomputed')
+    def collect_precomputed(self) -> Dict[str, Any]:
+        '''Finish precompute_imports_in_background() for the current buffer.
+        Returns {'state': 'running'|'stale'|'done', 'imports': {...}}, where
+        imports are the same as precompute_imports() if done; 'stale' if the
+        buffer has changed meanwhile (or nothing is in progress).'''
+        bufnr = vim.current.buffer.number
+        if bufnr not in self._in_progress:
+            return {'state': 'stale', 'imports': {}}
+        changedtick, lines, future = self._in_progress[bufnr]
+        if not future.done():
+            return {'state': 'running', 'imports': {}}
+        del self._in_progress[bufnr]
+        if changedtick != funcref('getbufvar')('%', 'changedtick'):
+            return {'state': 'stale', 'imports': {}}
+        entries = self._store_precomputed(bufnr, changedtick, lines,
+                                          future.result())
+        return {'state': 'done', 'imports': entries}
+
+    def _resolve_unresolved(self, lines: List[str],
+                            ) -> List[Tuple[str, str, LineNumber]]:
+        '''Resolve the unresolved symbols in the lines that are not imported
+        yet, without user interaction: [(symbol, import statement, usage)].
+        This makes no vim calls, so it can run in any thread.'''
+        resolved = []
+        for symbol, usage_line_nr in self.find_unresolved_symbols(lines):
+            import_statement = self.resolve_unambiguous(symbol)
+            if not import_statement:
+                continue
+            if self.find_line(lines, import_statement):
+                continue  # already exists
+            resolved.append((symbol, import_statement, usage_line_nr))
+        return resolved
+
+    def _store_precomputed(self, bufnr: int, changedtick: int, lines: List[str],
+                           resolved: List[Tuple[str, str, LineNumber]],
+                           ) -> Dict[str, Dict[str, Any]]:
+        line_nrs = self.determine_linenumbers(
+            [statement for (_, statement, _) in resolved], lines)
+        entries: Dict[str, Dict[str, Any]] = {
+            symbol: {'statement': statement, 'line': line_nr, 'usage': usage}
+            for ((symbol, statement, usage), line_nr) in zip(resolved, line_nrs)}
+        self._precomputed[bufnr] = (changedtick, entries)
+        return entries
 
+    def _get_precomputed(self, symbol: str) -> Optional[Dict[str, Any]]:
+        '''Get the precomputed import for the symbol if it is still valid.'''
+        buf = vim.current.buffer
+        if buf.number not in self._precomputed:
+            return None
+        changedtick, entries = self._precomputed[buf.number]
+        if symbol not in entries:
+            stats.cache_access('precomputed', hit=False)
+            return None
+        if changedtick != funcref('getbufvar')('%', 'changedtick'):
+            del self._precomputed[buf.number]  # stale
+            stats.cache_access('precomputed', hit=False)
+            return None
+        stats.cache_access('precomputed', hit=True)
+        return entries[symbol]
+
+    def _update_precomputed(self, import_statement: str, line_nr: LineNumber,
+                            num_lines: int):
+        '''Keep the precomputed imports of the current buffer valid after
+        inserting num_lines lines (for the import statement) at line_nr, rather
+        than discarding all of them, e.g. when accepting all pending imports.'''
+        bufnr = vim.current.buffer.number
+        if bufnr not in self._precomputed:
+            return
+        _, entries = self._precomputed[bufnr]
+        for entry in entries.values():
+            if entry['statement'] == import_statement:
+                entry['line'] = 0   # already exists
+                continue
+            # an import for the same line goes above the inserted one, as the
+            # inserted one is now the first line that is not a comment, etc.
+            if entry['line'] > line_nr:
+                entry['line'] += num_lines
+            if entry['usage'] >= line_nr:
+                entry['usage'] += num_lines
+        changedtick = funcref('getbufvar')('%', 'changedtick')
+        self._precomputed[bufnr] = (changedtick, entries)
+
+    @stats.timed('import_symbol')
     def import_symbol(self, symbol: str) -> Dict[str, Any]:
         '''Add an import statement for the given symbol.'''
+        precomputed = self._get_precomputed(symbol)
+        if precomputed:
+            import_statement = precomputed['statement']
+            line_nr = precomputed['line']
+            if line_nr > 0:
+                num_lines = self._insert_import(line_nr, import_statement)
+                self._update_precomputed(import_statement, line_nr, num_lines)
+            return {'statement': import_statement, 'line': line_nr}
+
         import_statement = self.resolve_import(symbol)
         if not import_statement:
             return {}
@@ -73,6 +281,7 @@ class AutoImportManager(ABC):
         else:  # already exists
             return {'statement': import_statement, 'line': 0}
 
+    @stats.timed('add_import')
     def add_import(self, import_statement: str) -> LineNumber:
         '''Add a raw import statement line to the current buffer,
         at a proper location.
@@ -84,10 +293,6 @@ class AutoImportManager(ABC):
             raise ValueError("Not a import statement: {}".format(import_statement))
 
         buf = vim.current.buffer
-        def getline(line_nr: LineNumber):
-            return buf[line_nr - 1]
-        def insertline(line_nr: LineNumber, line: str):
-            return funcref('append')(line_nr - 1, line)
 
         # TODO: need to determine the current symbol was imported or not (or
         # it can be existing alias, variables, etc.) being semantics-aware.
@@ -98,6 +303,18 @@ class AutoImportManager(ABC):
             return 0
 
         line_nr: LineNumber = self.determine_linenumber(import_statement)
+        self._insert_import(line_nr, import_statement)
+        return line_nr
+
+    def _insert_import(self, line_nr: LineNumber, import_statement: str) -> int:
+        '''Insert the import statement at the given line number (1-indexed)
+        of the current buffer. Returns the number of inserted lines.'''
+        buf = vim.current.buffer
+        def getline(line_nr: LineNumber):
+            return buf[line_nr - 1]
+        def insertline(line_nr: LineNumber, line: str):
+            return funcref('append')(line_nr - 1, line)
+
         insertline(line_nr, import_statement.rstrip())
 
         # Insert reasonable blank lines below
@@ -105,9 +322,11 @@ class AutoImportManager(ABC):
         if line_nr + 1 <= len(buf) and \
                 not self.is_import_statement(getline(line_nr + 1)):
             insertline(line_nr + 1, '')
+            return 2
 
-        return line_nr
+        return 1
 
+    @stats.timed('find_line')
     def find_line(self, buf, line: str) -> LineNumber:
         '''Search for the line in the buffer (to avoid duplicate imports),
         after stripping out comments.
@@ -123,6 +342,7 @@ class AutoImportManager(ABC):
     def list_all(self) -> Iterable[Tuple[str, List[Any]]]:
         return []
 
+    @stats.timed('suggest')
     def suggest(self, query='', max_items=50) -> Dict[str, List[str]]:
         try:
             # TODO: we need some proper ranking and fuzzy search.
@@ -0,0 +1,205 @@
+"""Budgets of vim RPCs for AutoImportManager operations.
+
+Each host call costs a round-trip under neovim's msgpack host, which dominates
+the latency. These tests make sure that later changes do not silently
+(re)introduce RPCs that grow with the number of lines in the buffer.
+"""
+
+import sys
+
+import pytest
+
+
+SOURCE = [
+    '#!/usr/bin/env python',
+    '"""A docstring',
+    '',
+    'spanning multiple lines.',
+    '"""',
+    '',
+    'import os',
+    'import sys',
+    '',
+    'x = os.path.join("a", "b")',
+]
+
+
+def _lines(docstring_lines=2, body_lines=10):
+    return (['# comment'] * 2 + ['"""Docstring'] + ['...'] * docstring_lines +
+            ['"""', '', 'import os', ''] + ['x = 1'] * body_lines)
+
+
+@pytest.fixture
+def manager():
+    from vim_autoimport.managers.python import PythonImportManager
+    return PythonImportManager()
+
+
+def measure(fake_vim, lines, fn):
+    fake_vim.set_lines(lines)
+    fake_vim.reset_calls()
+    result = fn()
+    print(fake_vim.count_calls(), fake_vim.calls)
+    return result, fake_vim.count_calls()
+
+
+def testFindLineBudget(fake_vim, manager):
+    r, rpcs = measure(fake_vim, SOURCE,
+                      lambda: manager.find_line(fake_vim.current.buffer, 'import sys'))
+    assert r == 8
+    assert rpcs <= 2
+
+
+def testDetermineLinenumberBudget(fake_vim, manager):
+    # next to the import statement for the same package
+    r, rpcs = measure(fake_vim, SOURCE,
+                      lambda: manager.determine_linenumber('from os import path'))
+    assert r == 7
+    assert rpcs <= 2
+
+    # the first line that is not a comment, docstring, etc.
+    r, rpcs = measure(fake_vim, SOURCE,
+                      lambda: manager.determine_linenumber('import re'))
+    assert r == 7
+    assert rpcs <= 3
+
+    # should not grow (linearly) with the length of comments or docstrings
+    for n in (10, 40, 200):
+        r, rpcs = measure(fake_vim, _lines(docstring_lines=n, body_lines=1000),
+                          lambda: manager.determine_linenumber('import re'))
+        assert r == n + 6
+        assert rpcs <= 5, "determine_linenumber() is O(lines) in RPCs?"
+
+
+def testAddImportBudget(fake_vim, manager):
+    r, rpcs = measure(fake_vim, SOURCE, lambda: manager.add_import('import re'))
+    assert r == 7
+    assert fake_vim.lines[6:9] == ['import re', 'import os', 'import sys']
+    assert rpcs <= 9
+
+    # duplicates: no change
+    r, rpcs = measure(fake_vim, SOURCE, lambda: manager.add_import('import os'))
+    assert r == 0
+    assert fake_vim.lines == SOURCE
+    assert rpcs <= 2
+
+    r, rpcs = measure(fake_vim, _lines(docstring_lines=200, body_lines=1000),
+                      lambda: manager.add_import('import re'))
+    assert r == 206
+    assert rpcs <= 11
+
+
+def testImportSymbolBudget(fake_vim, manager):
+    r, rpcs = measure(fake_vim, SOURCE, lambda: manager.import_symbol('re'))
+    assert r == {'statement': 'import re', 'line': 7}
+    assert rpcs <= 10
+
+    r, rpcs = measure(fake_vim, SOURCE, lambda: manager.import_symbol('os.path'))
+    assert r == {'statement': 'import os.path', 'line': 7}
+    assert fake_vim.lines[6:9] == ['import os.path', 'import os', 'import sys']
+    assert rpcs <= 10
+
+
+def testRPCsRecordedInStats(fake_vim, manager):
+    """All the host calls (evals, buffer reads, etc.) are counted in stats,
+    not only function calls, for rpcs/call in :AutoImportStats."""
+    from vim_autoimport import stats, vim_utils
+    stats.reset()
+    fake_vim.set_lines(_lines(docstring_lines=10))
+    fake_vim.reset_calls()
+    with stats.timed('test'):
+        manager.add_import('import re')
+        vim_utils.host.eval('&filetype')
+    assert stats.as_dict()['operations']['test']['rpcs'] == \
+        fake_vim.count_calls()
+    assert fake_vim.count_calls('buffer') > 0
+
+
+def testImportSymbolPrecomputedBudget(fake_vim, manager):
+    source = SOURCE + ['y = np.zeros(3)', 'z = re.compile(x)']
+    fake_vim.set_lines(source)
+    pending = manager.precompute_imports()
+    assert pending == {
+        'np.zeros': {'statement': 'import numpy as np', 'line': 7, 'usage': 11},
+        're.compile': {'statement': 'import re', 'line': 7, 'usage': 12},
+    }
+
+    # a cache hit: no need to resolve and determine line numbers
+    fake_vim.reset_calls()
+    r = manager.import_symbol('re.compile')
+    assert r == {'statement': 'import re', 'line': 7}
+    print(fake_vim.calls)
+    assert ('call', 'map') not in fake_vim.calls
+    assert fake_vim.count_calls() <= 8   # including revalidation of the rest
+
+    # still valid after the insertion above, e.g. to accept all pending ones
+    fake_vim.reset_calls()
+    r = manager.import_symbol('np.zeros')
+    assert r == {'statement': 'import numpy as np', 'line': 7}
+    assert ('call', 'map') not in fake_vim.calls
+    assert fake_vim.lines[6:10] == ['import numpy as np', 'import re',
+                                    'import os', 'import sys']
+
+
+MODULES = ['json', 'math', 'random', 'itertools', 'functools', 'collections',
+           'time', 'datetime', 'string', 'textwrap', 'shutil', 'glob',
+           'pathlib', 'heapq', 'bisect']
+
+
+def testPrecomputeImportsBudget(fake_vim, manager):
+    # should not grow with the number of unresolved symbols
+    for n in (1, 5, len(MODULES)):
+        source = _lines(docstring_lines=10) + [
+            'y = {}.attr'.format(m) for m in MODULES[:n]]
+        pending, rpcs = measure(fake_vim, source, manager.precompute_imports)
+        assert len(pending) == n
+        assert set(e['line'] for e in pending.values()) == {16}
+        assert rpcs <= 5, "precompute_imports() is O(symbols) in RPCs?"
+
+
+def testPrecomputeImportsInBackground(fake_vim, manager):
+    source = SOURCE + ['y = np.zeros(3)', 'z = re.compile(x)']
+    fake_vim.set_lines(source)
+    assert manager.collect_precomputed()['state'] == 'stale'   # not started
+
+    manager.precompute_imports_in_background()
+    manager._in_progress[1][2].result(timeout=5.0)   # wait for the thread
+    r = manager.collect_precomputed()
+    assert r == {'state': 'done', 'imports': {
+        'np.zeros': {'statement': 'import numpy as np', 'line': 7, 'usage': 11},
+        're.compile': {'statement': 'import re', 'line': 7, 'usage': 12},
+    }}
+    assert manager.import_symbol('re.compile') == \
+        {'statement': 'import re', 'line': 7}
+
+    # the buffer has changed while resolving
+    manager.precompute_imports_in_background()
+    fake_vim.buffer.changedtick += 1
+    manager._in_progress[1][2].result(timeout=5.0)
+    assert manager.collect_precomputed() == {'state': 'stale', 'imports': {}}
+
+
+def testImportSymbolPrecomputedInvalidated(fake_vim, manager):
+    source = ['import os', '', 'x = 1', 'y = np.zeros(3)', 'z = np.ones(3)',
+              'w = re.compile(x)']
+    fake_vim.set_lines(source)
+    pending = manager.precompute_imports()
+    assert {s: e['line'] for s, e in pending.items()} == \
+        {'np.zeros': 1, 'np.ones': 1, 're.compile': 1}
+
+    # the same statement is added only once
+    assert manager.import_symbol('np.ones') == \
+        {'statement': 'import numpy as np', 'line': 1}
+    assert manager.import_symbol('np.zeros') == \
+        {'statement': 'import numpy as np', 'line': 0}
+    assert fake_vim.lines[:3] == ['import numpy as np', 'import os', '']
+
+    # the buffer has changed (not by us), so precomputed ones are invalidated
+    fake_vim.buffer.changedtick += 1
+    fake_vim.reset_calls()
+    r = manager.import_symbol('re.compile')
+    assert r == {'statement': 'import re', 'line': 1}
+    assert ('call', 'map') in fake_vim.calls
+
+if __name__ == '__main__':
+    pytest.main(["-s", "-v"] + sys.argv)
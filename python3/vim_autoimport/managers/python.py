@@ -1,21 +1,28 @@
 """vim_autoimport.managers.python"""
 
 import abc
+import ast
 import asyncio
+import bisect
+import builtins
 import functools
 import os
 import pkgutil
+import re
 import shutil
 import sys
 import sysconfig
+import threading
+import time
 from collections import defaultdict, namedtuple
-from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type
 
-import vim
-
-from .. import vim_utils
-from ..vim_utils import echomsg, funcref
-from .manager import AutoImportManager, LineNumber, StrategyNotReadyError
+from .. import conventions, stats, vim_utils
+from ..vim_utils import echomsg
+from ..vim_utils import host as vim   # records RPCs
+from .manager import AutoImportManager, LineNumber
+from .manager import StrategyFailedError, StrategyNotReadyError
+from .python_reexports import ReexportGraph, is_public, scan_reexports
 
 ImportStatement = str
 
@@ -56,6 +63,100 @@ class PyImport:
     def __repr__(self):
         return 'PyImport("{}")'.format(str(self))
 
+    @classmethod
+    def parse(cls, statement: ImportStatement) -> Optional['PyImport']:
+        """The inverse of str(), e.g. 'import numpy as np' -> PyImport."""
+        m = _IMPORT_STATEMENT.match(statement)
+        if not m:
+            return None
+        if m.group('from'):
+            return cls(m.group('from'), m.group('name'), m.group('alias'))
+        return cls(m.group('name'), alias=m.group('alias'))
+
+
+_IMPORT_STATEMENT = re.compile(
+    r'^(?:from (?P<from>[\w.]+) )?import (?P<name>[\w.]+)(?: as (?P<alias>\w+))?$')
+
+
+def _ancestor_packages(symbol_chain: str) -> Iterable[str]:
+    """p.a.c.k.a.g.e.symbol -> itself first, and then all the ancestors
+    (p.a.c.k.a.g.e, p.a.c.k.a.g, ...) so that any known package is imported."""
+    yield symbol_chain  # itself first
+
+    chain = symbol_chain.split('.')
+    for k in range(1, len(chain)):
+        yield '.'.join(chain[:-k])
+
+
+def _find_unresolved_names(source: str) -> List[Tuple[str, LineNumber]]:
+    """Find the (dotted) names that are used but never bound in the source,
+    with the line number of their first usage. This is only an approximation
+    as it is not aware of scopes; a name bound anywhere is treated as defined.
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return []  # incomplete code while editing, etc.
+
+    defined = set(dir(builtins))
+    for node in ast.walk(tree):
+        if isinstance(node, ast.alias) and node.name == '*':
+            return []  # `from x import *` can define any name
+        if isinstance(node, ast.alias):
+            defined.add((node.asname or node.name).split('.')[0])
+        elif isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+            defined.add(node.id)
+        elif isinstance(node, ast.arg):
+            defined.add(node.arg)
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            defined.update(node.names)
+        elif isinstance(getattr(node, 'name', None), str):
+            defined.add(node.name)   # def, class, except ... as, match, etc.
+
+    unresolved: Dict[str, LineNumber] = {}
+
+    class _Visitor(ast.NodeVisitor):
+        def visit_Name(self, node: ast.Name):
+            self._add(node.id, node)
+
+        def visit_Attribute(self, node: ast.Attribute):
+            # the outermost attribute chain only, e.g. np.linalg.norm
+            chain, value = [node.attr], node.value
+            while isinstance(value, ast.Attribute):
+                chain.append(value.attr)
+                value = value.value
+            if not isinstance(value, ast.Name):
+                return self.generic_visit(node)
+            chain.append(value.id)
+            self._add('.'.join(reversed(chain)), value)
+
+        def _add(self, name: str, node: ast.Name):
+            root = name.split('.')[0]
+            if not isinstance(node.ctx, ast.Load) or root in defined:
+                return
+            if root.startswith('__') and root.endswith('__'):
+                return  # __file__, etc.
+            unresolved.setdefault(name, node.lineno)
+
+    _Visitor().visit(tree)
+    return list(unresolved.items())
+
+
+class _lazy_classattr:
+    """A class attribute that is computed on its first access (and cached),
+    e.g. paths that are expensive to find at import time."""
+
+    def __init__(self, fn: Callable[[], Any]):
+        self.fn = fn
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        value = self.fn()
+        setattr(owner, self.name, value)   # replaces the descriptor
+        return value
+
 
 class PythonImportResolveStrategy(abc.ABC):
     """Strategy interface for AutoImportManager.resolve_import(). All instances
@@ -66,6 +167,98 @@ class PythonImportResolveStrategy(abc.ABC):
         del symbol
         raise NotImplementedError
 
+    def candidates(self, symbol: str) -> List[PyImport]:
+        """Return all the candidates for the symbol in the order of preference.
+        Unlike __call__, this should never require any user interaction."""
+        r = self(symbol)
+        return [r] if r else []
+
+    def members(self, package: str, prefix: str = '') -> List[str]:
+        """Return the (sorted) names of known members of the package
+        (or module) that start with the prefix."""
+        del package, prefix
+        return []
+
+    def pick(self, symbol: str, candidates: List[PyImport],
+             ) -> Optional[PyImport]:
+        """Pick one of the candidates without user interaction, or None if
+        it is ambiguous (i.e. user needs to choose one)."""
+        del symbol
+        return candidates[0] if candidates else None
+
+    def reindex(self):
+        """Rebuild the index, if any (e.g. after installing packages)."""
+        pass
+
+    def warm_up(self):
+        """Build the index, if any, ahead of the first query (at idle time)."""
+        pass
+
+
+MembersIndex = Dict[str, List[str]]   # package -> sorted list of members
+
+
+def _build_members_index(index: Dict[str, List[PyImport]]) -> MembersIndex:
+    """Build a reverse index from a package to its members, from a index
+    (e.g. ctags) of symbols. Every `from {package} import {symbol}` entry
+    (indexed by symbol, or by its full name) makes symbol a member of the
+    package."""
+    members: Dict[str, set] = defaultdict(set)
+    for key, imports in index.items():
+        for imp in imports:
+            if imp.symbol and (imp.symbol == key or
+                               key == imp.package + '.' + imp.symbol):
+                members[imp.package].add(imp.symbol)
+    return {package: sorted(names) for (package, names) in members.items()}
+
+
+def _build_tags(entries: Iterable[Tuple[str, str]],
+                shadowed: Iterable[Tuple[str, str]] = (),
+                ) -> Dict[str, List[PyImport]]:
+    """Build an index of imports from (symbol, package) pairs, where the
+    symbol is defined in (or exported by) the package.
+
+    `shadowed` pairs are re-exported by a preferred path (in `entries`), so
+    they are indexed by their full name rather than by the symbol; i.e. the
+    package and its members are kept, without making the symbol ambiguous.
+    """
+    tags: Dict[str, List[PyImport]] = defaultdict(list)
+    keyed = [(symbol, package, symbol) for (symbol, package) in entries]
+    keyed += [(symbol, package, package + '.' + symbol)
+              for (symbol, package) in shadowed]
+    for symbol, package, key in keyed:
+        package_parent, _, package_rmost = package.rpartition('.')
+
+        tags[key].append(PyImport(package=package, symbol=symbol))
+        # index the module itself as well
+        tags[package].append(PyImport(package=package))
+        if package_parent:
+            tags[package_rmost].append(
+                PyImport(package=package_parent, symbol=package_rmost))
+            tags[package_rmost + '.' + symbol].append(
+                PyImport(package=package_parent, symbol=package_rmost))
+
+    # remove duplicates
+    for key, lst in tags.items():
+        if len(lst) > 1:
+            tags[key] = list(sorted(set(lst)))
+
+    # a plain dict, which is never mutated (even by lookups) once built
+    return dict(tags)
+
+
+def _query_members(members: MembersIndex, package: str,
+                   prefix: str = '') -> List[str]:
+    """Find members of the package that start with prefix, in O(log n)."""
+    names = members.get(package)
+    if not names:
+        return []
+    if not prefix:
+        return list(names)
+    lo = bisect.bisect_left(names, prefix)
+    hi = bisect.bisect_left(names, prefix + '\U0010ffff', lo)
+    return names[lo:hi]
+
 
 class PythonImportManager(AutoImportManager):
     """A import manager for Python.
@@ -76,37 +269,68 @@ class PythonImportManager(AutoImportManager):
     """
 
     def __init__(self):
-        if not DB:
-            _build_database()   # TODO: Add thread lock.
+        super().__init__()
+        _event_loop()   # record it, if on the main thread
+        # Strategies are created on the first query (or warm_up), so that
+        # creating a manager costs nothing.
+        self._strategies_list: Optional[List[PythonImportResolveStrategy]] = None
+        self._strategies_lock = threading.Lock()
 
-        self._strategies = self.create_strategies()
+    @property
+    def _strategies(self) -> List[PythonImportResolveStrategy]:
+        strategies = self._strategies_list
+        if strategies is None:
+            with self._strategies_lock:
+                if self._strategies_list is None:
+                    self._strategies_list = self.create_strategies()
+                strategies = self._strategies_list
+        return strategies
+
+    def warm_up(self) -> None:
+        for strategy in self._strategies:
+            strategy.warm_up()
 
     def create_strategies(self) -> List[PythonImportResolveStrategy]:
         # ctags requires asyncio, which does not work on vim8.
         enable_ctags = vim_utils.is_neovim and shutil.which("ctags")
+        # importing compiled modules in subprocesses (opt-in)
+        enable_introspection = vim_utils.get_option('introspection', False)
         strategies = [
+            LearnedConventionStrategy(),
             DBLookupStrategy(),
             ImportableModuleStrategy(),
             BuiltinCTagsStrategy() if enable_ctags else None,
+            TypeshedCTagsStrategy() if enable_ctags and \
+                TypeshedCTagsStrategy.lib_directory else None,
             SitePackagesCTagsStrategy() if enable_ctags else None,
+            IntrospectionStrategy(
+                timeout=vim_utils.get_option('introspection_timeout', 10.0),
+                memory_limit=vim_utils.get_option(
+                    'introspection_memory_limit', 2048) << 20,   # MB
+            ) if enable_introspection else None,
         ]
         return [s for s in strategies if s]
 
+    def reindex(self) -> None:
+        for strategy in self._strategies:
+            strategy.reindex()
+
+    def index_status(self) -> Dict[str, Dict[str, Any]]:
+        return {type(s).__name__: s.status() for s in self._strategies
+                if isinstance(s, IndexedStrategy)}
+
     async def wait_until_strategies_ready(self):
         """Wait until all async strategies complete their loading."""
+        import concurrent.futures
         for s in self._strategies:
             if hasattr(s, '_future') and asyncio.isfuture(s._future):
                 await s._future
+            elif isinstance(getattr(s, '_future', None),
+                            concurrent.futures.Future):
+                await asyncio.wrap_future(s._future)
 
+    @stats.timed('resolve_import')
     def resolve_import(self, symbol: str) -> Optional[str]:
-        # p.a.c.k.a.g.e.symbol -> if any ancestor package is known, import it
-        def _ancestor_packages(symbol_chain: str):
-            yield symbol_chain  # itself first
-
-            chain = symbol_chain.split('.')
-            for k in range(1, len(chain)):
-                yield '.'.join(chain[:-k])
-
         # apply candidates (symbol itself and its all ancestors),
         # and if any match is found by a strategy return it
         for candidate_symbol in _ancestor_packages(symbol):
@@ -122,6 +346,70 @@ class PythonImportManager(AutoImportManager):
                     return str(r)
         return None
 
+    @stats.timed('resolve_many')
+    def resolve_many(self, symbols: Iterable[str]) -> Dict[str, List[PyImport]]:
+        result: Dict[str, List[PyImport]] = {}
+        for symbol in symbols:
+            if symbol in result:
+                continue
+            # Rank by the same precedence as resolve_import(): the symbol
+            # itself before its ancestors, and then the order of strategies.
+            candidates: Dict[PyImport, None] = {}  # an ordered set
+            for candidate_symbol in _ancestor_packages(symbol):
+                for strategy in self._strategies:
+                    try:
+                        candidates.update(dict.fromkeys(
+                            strategy.candidates(candidate_symbol)))
+                    except StrategyNotReadyError:
+                        pass
+            result[symbol] = list(candidates)
+        return result
+
+    @stats.timed('resolve_unambiguous')
+    def resolve_unambiguous(self, symbol: str) -> Optional[str]:
+        for candidate_symbol in _ancestor_packages(symbol):
+            for strategy in self._strategies:
+                try:
+                    candidates = strategy.candidates(candidate_symbol)
+                except StrategyNotReadyError:
+                    continue
+                if candidates:
+                    picked = strategy.pick(candidate_symbol, candidates)
+                    return str(picked) if picked else None
+        return None
+
+    def find_unresolved_symbols(self, lines: List[str],
+                                ) -> List[Tuple[str, LineNumber]]:
+        return _find_unresolved_names('\n'.join(lines))
+
+    def qualifier_packages(self, qualifier: str) -> List[str]:
+        """Get full package names that a qualifier may refer to, e.g.
+        np -> numpy, np.linalg -> numpy.linalg, nn -> torch.nn."""
+        root, _, rest = qualifier.partition('.')
+        packages: Dict[str, None] = {qualifier: None}  # an ordered set
+        for strategy in self._strategies:
+            try:
+                candidates = strategy.candidates(root)
+            except StrategyNotReadyError:
+                continue
+            for c in candidates:
+                package = c.package + ('.' + c.symbol if c.symbol else '')
+                packages[package + ('.' + rest if rest else '')] = None
+        return list(packages)
+
+    @stats.timed('members')
+    def members(self, qualifier: str, prefix: str = '') -> List[str]:
+        """Query the members of a package (or its alias, e.g. np) that start
+        with the prefix. e.g. members('np', 'lin') -> ['linalg', 'linspace']"""
+        names = set()
+        for package in self.qualifier_packages(qualifier):
+            for strategy in self._strategies:
+                try:
+                    names.update(strategy.members(package, prefix))
+                except StrategyNotReadyError:
+                    pass
+        return sorted(names)
+
     def is_import_statement(self, line: str) -> bool:
         line = line.strip()
         if '\n' in line:
@@ -133,38 +421,62 @@ class PythonImportManager(AutoImportManager):
          '@comment', '@string.documentation']
     )
 
+    # Only the first lines are scanned to place import statements.
+    MAX_LINES = 1000
+
+    @stats.timed('determine_linenumber')
     def determine_linenumber(self, import_statement: str) -> LineNumber:
         # If there is another import statement for the same package as the
         # given one, place nearby the import statement.
         # Otherwise, find the first non-empty, non-comment line and place there.
-        buf = vim.current.buffer
-        ln: LineNumber
-        max_lines = 1000
-
+        # Note: RPCs should not grow linearly with the number of lines.
+        lines: List[str] = vim.current.buffer[:self.MAX_LINES]
+        return (self._find_similar_import(import_statement, lines) or
+                self._find_first_code_line(lines))
+
+    @stats.timed('determine_linenumbers')
+    def determine_linenumbers(self, import_statements: List[str],
+                              lines: List[str]) -> List[LineNumber]:
+        # the first code line is the same for all, so found (by RPCs) once
+        lines = lines[:self.MAX_LINES]
+        first_code_line: Optional[LineNumber] = None
+        line_nrs = []
+        for import_statement in import_statements:
+            line_nr = self._find_similar_import(import_statement, lines)
+            if not line_nr:
+                if first_code_line is None:
+                    first_code_line = self._find_first_code_line(lines)
+                line_nr = first_code_line
+            line_nrs.append(line_nr)
+        return line_nrs
+
+    def _find_similar_import(self, import_statement: str,
+                             lines: List[str]) -> LineNumber:
+        """The line of an import statement for the same package, or 0."""
         tokens = import_statement.split()
         if len(tokens) > 1:
             pkg = tokens[1]  # import <pkg>, from <pkg> import ...
-            _line, _col = funcref('line')('.'), funcref('col')('.')
-            try:
-                funcref('cursor')(1, 1)
-                ln = funcref('search')(r'\v^(from|import) {}'.format(pkg),
-                             'n', max_lines)
-                if ln:  # a line for similar module was found
+            pattern = re.compile(r'^(from|import) {}'.format(re.escape(pkg)))
+            for ln, bline in enumerate(lines, start=LineNumber(1)):
+                if pattern.match(bline):  # a line for similar module was found
                     return ln
-            finally:
-                funcref('cursor')(_line, _col)
-
-        # find a non-empty line
-        bline: str
-        for ln, bline in enumerate(buf, start=LineNumber(1)):
-            if ln > max_lines:
-                break  # do not scan too many lines
-
-            if bline == '':
-                continue
-            if self._get_hlgroups_at_line(ln) & self.AVOID_SYNGROUPS:
-                continue
-            return ln
+        return 0
+
+    def _find_first_code_line(self, lines: List[str]) -> LineNumber:
+        """The first non-empty line that is not a comment, docstring, etc."""
+        # check syntax groups in batches of exponentially increasing sizes
+        # (RPCs grow logarithmically).
+        nonempty: List[LineNumber] = [
+            ln for ln, bline in enumerate(lines, start=LineNumber(1))
+            if bline != '']
+        k, batch_size = 0, 64
+        while k < len(nonempty):
+            batch = nonempty[k:k + batch_size]
+            for ln, hlgroups in zip(batch, self._get_hlgroups_at_lines(batch)):
+                if hlgroups & self.AVOID_SYNGROUPS:
+                    continue
+                return ln
+            k, batch_size = k + batch_size, batch_size * 2
 
         # cannot resolve, put in the topmost line
         return 1
@@ -174,17 +486,17 @@ class PythonImportManager(AutoImportManager):
         # TODO: Support ImportableModuleStrategy just in case ctags is unavailable.
         maps = []
         for strategy in self._strategies:
-            if not isinstance(strategy, CTagsStrategy):
+            if not isinstance(strategy, IndexedStrategy):
+                continue
+            # Only the indexes that are ready, e.g. introspection can take
+            # minutes (and some may have failed)
+            try:
+                maps.append(strategy._tags)
+            except StrategyNotReadyError:
                 continue
-            if not hasattr(strategy, '_tags'):
-                # TODO: can we return a partial list and later refresh it?
-                raise StrategyNotReadyError("ctags database hasn't been built")
-            maps.append(strategy._tags)
-
-        # TODO: Using ChainMap causes a weird bug where the former defaultdict
-        # would create an unwanted entry with keys that exist in the latter.
-        # We simply workaround this using copy. But why is that happening?
-        #return list(collections.ChainMap(*maps).items())
+
+        # Note: indexes used to be defaultdicts, where ChainMap's lookup
+        # created unwanted entries; a copy also gives a consistent snapshot.
         M = {}
         for m in maps[::-1]:
            M.update(m)
@@ -192,61 +504,362 @@ class PythonImportManager(AutoImportManager):
 
 
 class DBLookupStrategy(PythonImportResolveStrategy):
-    """Lookup the database as-is."""
+    """Lookup the database as-is (which is built on the first lookup)."""
+
+    _members: Optional[MembersIndex] = None
 
     def __call__(self, symbol: str) -> Optional[PyImport]:
-        if symbol in DB:
-            return next(iter((DB[symbol])))
-        return None
+        imports = _build_database().get(symbol)
+        return imports[0] if imports else None
+
+    def candidates(self, symbol: str) -> List[PyImport]:
+        return list(_build_database().get(symbol, ()))
+
+    def members(self, package: str, prefix: str = '') -> List[str]:
+        members = self._members
+        if members is None:
+            members = self._members = _build_members_index(_build_database())
+        return _query_members(members, package, prefix)
+
+    def warm_up(self):
+        self.members('')
+
+
+class ModuleTree:
+    """A tree of importable modules (e.g. vim_autoimport -> managers ->
+    python), where submodules of a package are enumerated lazily with
+    pkgutil.iter_modules() on the first access, and cached."""
+
+    def __init__(self, name: str = '',
+                 module_info: Optional[pkgutil.ModuleInfo] = None):
+        self.name = name  # full name, or '' for the root
+        self.module_info = module_info
+        self._children: Optional[Dict[str, 'ModuleTree']] = None
+
+    @property
+    def children(self) -> Dict[str, 'ModuleTree']:
+        # No locking: the dict is published only when complete, so a thread
+        # either sees it as a whole or expands it again (which is idempotent).
+        if self._children is None:
+            self._children = {
+                module_info.name: ModuleTree(self._child_name(module_info.name),
+                                             module_info)
+                for module_info in self._iter_modules()}
+        return self._children
+
+    def _child_name(self, name: str) -> str:
+        return self.name + '.' + name if self.name else name
+
+    def _iter_modules(self) -> Iterable[pkgutil.ModuleInfo]:
+        if self.module_info is None:
+            return pkgutil.iter_modules()  # top-level modules in sys.path
+        if not self.module_info.ispkg:
+            return []
+        # find (without importing) the directories of the package
+        try:
+            spec = self.module_info.module_finder.find_spec(  # type: ignore
+                self.name)
+        except (ImportError, AttributeError, ValueError):
+            return []
+        if spec is None or not spec.submodule_search_locations:
+            return []
+        return pkgutil.iter_modules(list(spec.submodule_search_locations),
+                                    prefix='')
+
+    def find(self, name: str) -> Optional['ModuleTree']:
+        """Find the (sub)module of the full.dotted.name, or None."""
+        node: Optional[ModuleTree] = self
+        for part in name.split('.'):
+            node = node.children.get(part)
+            if node is None:
+                return None
+        return node
+
+
+class LearnedConventionStrategy(PythonImportResolveStrategy):
+    """Use the import statements that are dominantly used for the symbol in
+    user's codebases, e.g. `import tensorflow.compat.v1 as tf`.
+    See conventions.learn()."""
+
+    def __call__(self, symbol: str) -> Optional[PyImport]:
+        statement = conventions.get_table().dominant(symbol)
+        return PyImport.parse(statement) if statement else None
 
 
 class ImportableModuleStrategy(PythonImportResolveStrategy):
-    """Use pkgutil.iter_modules to get importable modules."""
+    """Use pkgutil.iter_modules to get importable modules (and submodules)."""
 
     def __init__(self):
-        modules = list(pkgutil.iter_modules())
-        self.importable_modules: List[str] = [
-            module_info.name for module_info in modules]
+        self.module_tree = ModuleTree()   # expanded lazily
+
+    def reindex(self):
+        self.module_tree = ModuleTree()   # will be expanded again lazily
+
+    def warm_up(self):
+        t0 = time.perf_counter()
+        top_level = self.module_tree.children
+        stats.record_index(type(self).__name__,
+                           build_time=time.perf_counter() - t0,
+                           symbols=len(top_level),
+                           memory=stats.estimate_size(list(top_level)))
 
     def __call__(self, symbol: str) -> Optional[PyImport]:
-        if symbol in self.importable_modules:
+        if self.module_tree.find(symbol):
             return PyImport(package=symbol)  # import {symbol}
         return None
 
+    def members(self, package: str, prefix: str = '') -> List[str]:
+        node = self.module_tree.find(package)
+        if node is None:
+            return []
+        return sorted(name for name in node.children if name.startswith(prefix))
+
+
+Index = namedtuple('Index', ['tags', 'members'])
+
+
+class IndexedStrategy(PythonImportResolveStrategy):
+    """Base class for strategies that lookup an index of symbols (`_tags`)
+    which is built in background, e.g. from ctags."""
+
+    # The index is swapped as a whole when (re)built; None until first built.
+    _index: Optional[Index] = None
+    # The error of the last build, if failed.
+    _error: Optional[str] = None
+
+    @property
+    def _tags(self) -> Dict[str, List[PyImport]]:
+        return self._get_index().tags
+
+    @property
+    def _members(self) -> MembersIndex:
+        return self._get_index().members
+
+    def _get_index(self) -> Index:
+        index = self._index
+        if index is None:
+            if self._error:
+                raise StrategyFailedError("{} failed: {}".format(
+                    type(self).__name__, self._error))
+            raise StrategyNotReadyError("{} hasn't been built".format(
+                type(self).__name__))
+        return index
+
+    def _set_index(self, index: Index):
+        self._index = index   # atomic swap
+        self._error = None
+
+    def candidates(self, symbol: str) -> List[PyImport]:
+        tags = self._tags
+        if symbol not in tags:
+            return []
+        candidates = tags[symbol]
+        if len(candidates) > 1:
+            # the most frequently used ones in user's codebases first
+            return conventions.get_table().rank(symbol, candidates)
+        return list(candidates)
+
+    def is_building(self) -> bool:
+        future = getattr(self, '_future', None)
+        return future is not None and not future.done()
+
+    def status(self) -> Dict[str, Any]:
+        """The status of the index: 'building', 'ready', or 'failed'."""
+        index = self._index
+        if self.is_building():
+            state = 'building'
+        elif self._error:
+            state = 'failed'
+        elif index is not None:
+            state = 'ready'
+        else:
+            state = 'not built'
+        return {'state': state, 'error': self._error,
+                'symbols': len(index.tags) if index is not None else 0}
+
+    def members(self, package: str, prefix: str = '') -> List[str]:
+        return _query_members(self._members, package, prefix)
+
+    def __call__(self, symbol: str) -> Optional[PyImport]:
+        candidates: List[PyImport] = self.candidates(symbol)
+        if not candidates:
+            return None
+
+        # If multiple entries, ask user to choose one (unless there is a
+        # dominant one in user's codebases)
+        picked = self.pick(symbol, candidates)
+        if picked:
+            return picked
+        if threading.current_thread() is not threading.main_thread():
+            return None  # cannot prompt (e.g. precomputing in background)
+        if len(candidates) > 1:
+            rv = vim_utils.ask_user([str(c) for c in candidates])
+            if not rv:
+                return None      # aborted, no import added
+            idx = rv - 1
+        else:
+            idx = 0
+
+        package = candidates[idx]
+        return package
+
+    def pick(self, symbol: str, candidates: List[PyImport],
+             ) -> Optional[PyImport]:
+        if len(candidates) == 1:
+            return candidates[0]
+        statement = conventions.get_table().dominant(
+            symbol, [str(c) for c in candidates])
+        return PyImport.parse(statement) if statement else None
+
+
+# The event loop that indexes are built on, i.e. of the main thread (which is
+# run by the neovim host). It is recorded on the main thread, so that it can be
+# used by strategies created on other threads.
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _event_loop() -> Optional[asyncio.AbstractEventLoop]:
+    """The event loop of the main thread, or None if not known yet."""
+    global _LOOP
+    if threading.current_thread() is threading.main_thread():
+        try:
+            _LOOP = asyncio.get_event_loop()
+        except RuntimeError:
+            pass  # no event loop (python 3.14+)
+    return _LOOP
+
+
+def _call_on_loop(fn: Callable[[], Any]) -> bool:
+    """Call fn now if on the thread of the event loop, or schedule it on the
+    loop otherwise. Returns whether it was called now."""
+    loop = _event_loop()
+    if threading.current_thread() is threading.main_thread():
+        fn()
+        return True
+    if loop is not None and not loop.is_closed():
+        loop.call_soon_threadsafe(fn)
+    return False
+
+
+class _Build(namedtuple('_Build', ['future', 'owner'])):
+    """A (possibly in-progress) build of an index, and its strategy class."""
+
+    def failed(self) -> bool:
+        return self.future.done() and (self.future.cancelled() or
+                                       self.future.exception() is not None)
+
+
+# The latest builds of ctags indexes: (strategy, lib_directory) -> _Build.
+# This is shared by all managers, and survives vim_autoimport.__reload__().
+_BUILDS: Dict[Tuple[str, str], _Build] = globals().get('_BUILDS', {})
+
+
+class CTagsStrategy(IndexedStrategy):
+    # Note: "exported" symbols (e.g. tf.Module) are resolved through static
+    # analysis of re-exports in __init__.py files (see python_reexports.py).
+    # TODO: It cannot import aliased package names (e.g. _pytest).
+
+    _future: Optional['asyncio.Future[None]'] = None
 
-class CTagsStrategy(PythonImportResolveStrategy):
-    # TODO: It cannot import "exported" symbols, e.g. tf.Module
-    # or aliased package names (e.g. _pytest).
     def __init__(self, is_async=True):
+        # build index from ctags in background without blocking UI.
+        # A strategy can be created by a query from any thread, but asyncio
+        # is not thread-safe: the build is started on the thread of the loop,
+        # and until then the index is not ready.
+        if not _call_on_loop(self._start):
+            return
+        if not is_async:
+            # block until database is built.
+            asyncio.get_event_loop().run_until_complete(self._future)
+
+    def _start(self, rebuild: bool = False):
         # Work around a bug https://bugs.python.org/issue35621 where
         # create_subprocess_shell() does not work with neovim's eventloop
         if hasattr(asyncio, 'get_child_watcher'):  # Python <3.14
             _w = asyncio.get_child_watcher()
             if getattr(_w, '_loop', None) is None:
                 _w.attach_loop(asyncio.get_event_loop())
-
-        if not is_async:
-            # block until database is built.
-            asyncio.get_event_loop().run_until_complete(
-                self._build_database())
+        self._future = self._start_build(rebuild=rebuild)
+
+    def warm_up(self):
+        if self._future is None:   # e.g. the loop was not known on creation
+            _call_on_loop(self._start)
+
+    def _build_key(self) -> Tuple[str, str]:
+        return (type(self).__name__, self.lib_directory)
+
+    def _start_build(self, rebuild: bool = False) -> 'asyncio.Future[None]':
+        """Start building the index, or join the build of the same directory
+        that is in progress (or done) by any other instance, e.g. of another
+        manager. If rebuild is set, the build in progress is cancelled."""
+        key = self._build_key()
+        build: Optional[_Build] = _BUILDS.get(key)
+        if build is not None and not rebuild and \
+                build.owner is type(self) and not build.failed():
+            pass  # coalesce
         else:
-            # build index from ctags in background without blocking UI.
-            self._future = asyncio.ensure_future(self._build_database())
-
-    async def _build_database(self) -> None:
+            previous, build = build, _Build(
+                asyncio.ensure_future(self._build_index()), type(self))
+            _BUILDS[key] = build
+            if previous is not None:
+                previous.future.cancel()   # kills ctags, if running
+        return asyncio.ensure_future(self._wait_for_build(key))
+
+    async def _wait_for_build(self, key) -> None:
+        while True:
+            build = _BUILDS[key]
+            try:
+                index = await asyncio.shield(build.future)
+            except asyncio.CancelledError:
+                if build.future.cancelled() and _BUILDS[key] is not build:
+                    continue   # superseded by a newer build, wait for it
+                raise
+            except Exception as e:
+                self._error = str(e) or type(e).__name__
+                return
+            self._set_index(index)
+            return
+
+    def reindex(self):
+        _call_on_loop(functools.partial(self._start, rebuild=True))
+
+    async def _build_index(self) -> Index:
+        proc: Optional[asyncio.subprocess.Process] = None
         try:
+            t0 = time.perf_counter()
             stdout = await self._run_ctags()
-            self._tags = await self._create_database_from_stream(stdout)
+            proc, self._proc = self._proc, None   # of this build
+            # analyze __init__.py in a thread, while ctags is running
+            reexports = await asyncio.get_event_loop().run_in_executor(
+                None, self._scan_reexports)
+            tags = await self._create_database_from_stream(stdout, reexports)
+            if proc is not None and await proc.wait() != 0:
+                raise RuntimeError("ctags exited with code {}".format(
+                    proc.returncode))
+            members = await asyncio.get_event_loop().run_in_executor(
+                None, _build_members_index, tags)
+            stats.record_index(type(self).__name__,
+                               build_time=time.perf_counter() - t0,
+                               symbols=len(tags),
+                               memory=stats.estimate_size(tags))
             echomsg("[vim-autoimport] Indexing {} is complete.".format(
                 self.lib_directory), hlgroup='MoreMsg')
+            return Index(tags, members)
+        except asyncio.CancelledError:
+            if proc is not None and proc.returncode is None:
+                proc.kill()
+            raise
         except Exception as e:
-            # TODO: Handle exception when ctags is not available.
-            # TODO: If exception happens, mark as failure rather than not-ready
             echomsg("[vim-autoimport] Error while running ctags: {}\n".format(e),
                     hlgroup='Error')
             vim_utils.print_exception(*sys.exc_info())
+            raise
 
     ctags_options = ''
+    # Directories (names or glob patterns) not to index, by ctags and
+    # by the scan of re-exports alike.
+    exclude_dirs: Tuple[str, ...] = ()
+    _proc: Optional[asyncio.subprocess.Process] = None   # set by _run_ctags()
 
     @property
     def lib_directory(self):
@@ -255,19 +868,30 @@ class CTagsStrategy(PythonImportResolveStrategy):
     async def _run_ctags(self) -> asyncio.StreamReader:
         # Note: exuberant-ctags ignores python-kinds,  TODO: add warning!
         # so universal-ctags is highly recommended (much faster).
+        excludes = ('test_*', '*_test') + tuple(self.exclude_dirs)
         cmd = ("ctags -f - --languages=python --python-kinds=-vm "
-               "--exclude='test_*' --exclude='*_test' "
-               "{} -R .".format(self.ctags_options))
+               "--langmap=python:+.pyi "   # also index stubs
+               "{} {} -R .".format(
+                   ' '.join("--exclude='{}'".format(e) for e in excludes),
+                   self.ctags_options))
         proc = await asyncio.create_subprocess_shell(
             cmd, cwd=self.lib_directory, limit=10 * 1024 * 1024,  # 10MB
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.DEVNULL)
         assert proc.stdout is not None
+        self._proc = proc   # to check the exit code, or kill if cancelled
         return proc.stdout
 
-    async def _create_database_from_stream(self, reader,
-                                           ) -> Dict[str, List[PyImport]]:
-        tags = defaultdict(list)
+    async def _create_database_from_stream(
+            self, reader, reexports: Optional[ReexportGraph] = None,
+    ) -> Dict[str, List[PyImport]]:
+        """Build an index from ctags output. If a re-export graph is given,
+        symbols are indexed by their public paths rather than where they are
+        defined, e.g. `from pkg import Foo` instead of pkg._internal.foo."""
+        # (symbol, package, whether it is from a stub)
+        entries: List[Tuple[str, str, bool]] = []
+        stub_packages = set()
+
         async for line in reader:
             line = line.strip()
             if isinstance(line, bytes):
@@ -283,62 +907,220 @@ class CTagsStrategy(PythonImportResolveStrategy):
             if symbol == '__init__':
                 continue  # overriding __init__, etc.
 
-            # convert filename to full.named.package
-            package: str = os.path.splitext(filename)[0].replace("/", ".")
-            package_parent, _, package_rmost = package.rpartition('.')
-            if (package_rmost.startswith('test_') or
-                package_rmost.endswith('_test')):
-                continue  # exclude test suites
-            if package_rmost == '__init__':
-                package = package[:-9]  # package.__init__ -> package
-                package_parent, _, package_rmost = package.rpartition('.')
-
-            tags[symbol].append(PyImport(package=package, symbol=symbol))
-            # index the module itself as well
-            tags[package].append(PyImport(package=package))
-            if package_parent:
-                tags[package_rmost].append(
-                    PyImport(package=package_parent, symbol=package_rmost))
-                tags[package_rmost + '.' + symbol].append(
-                    PyImport(package=package_parent, symbol=package_rmost))
-
-        # remove duplicates
-        for key, lst in tags.items():
-            if len(lst) > 1:
-                tags[key] = list(sorted(set(lst)))
-
-        return tags
-
-    def __call__(self, symbol: str) -> Optional[PyImport]:
-        if not hasattr(self, '_tags'):
-            raise StrategyNotReadyError("ctags database hasn't been built")
-
-        if symbol not in self._tags:
+            module = self._filename_to_module(filename)
+            if not module:
+                continue
+            package, is_stub = module
+
+            entries.append((symbol, package, is_stub))
+            if is_stub:
+                stub_packages.add(package)
+
+        # stubs (.pyi) take precedence over sources (.py)
+        pairs = [(symbol, package) for (symbol, package, is_stub) in entries
+                 if is_stub or package not in stub_packages]
+
+        # CPU-bound; in a thread so as not to block the event loop (i.e. UI)
+        def _build() -> Dict[str, List[PyImport]]:
+            public, shadowed = (reexports.publicize(pairs)
+                                if reexports is not None else (pairs, []))
+            return _build_tags(self._select_entries(public), shadowed)
+        return await asyncio.get_event_loop().run_in_executor(None, _build)
+
+    def _filename_to_module(self, filename: str) -> Optional[Tuple[str, bool]]:
+        """Convert a filename in ctags output to (full.named.package, whether
+        it is a stub), or None if it should not be indexed."""
+        filename = self._normalize_filename(filename)
+        if not filename:
             return None
 
-        # If multiple entries, ask user to choose one
-        candidates: List[PyImport] = self._tags[symbol]
-        if len(self._tags[symbol]) > 1:
-            rv = vim_utils.ask_user([str(c) for c in candidates])
-            if not rv:
-                return None      # aborted, no import added
-            idx = rv - 1
-        elif len(self._tags[symbol]) == 1:
-            idx = 0
-        else:
-            assert False, "tags cannot be empty! (symbol = {})".format(symbol)
-
-        package = self._tags[symbol][idx]
-        return package
+        module_path, ext = os.path.splitext(filename)
+        is_stub = (ext == '.pyi')
+        top, sep, rest = module_path.partition('/')
+        if top.endswith('-stubs'):
+            # stub-only distributions (PEP 561), e.g. pandas-stubs/
+            module_path = top[:-len('-stubs')] + sep + rest
+            is_stub = True
+        package: str = module_path.replace("/", ".")
+        package_parent, _, package_rmost = package.rpartition('.')
+        if (package_rmost.startswith('test_') or
+            package_rmost.endswith('_test')):
+            return None  # exclude test suites
+        if package_rmost == '__init__':
+            package = package[:-9]  # package.__init__ -> package
+        return package, is_stub
+
+    def _select_entries(self, pairs: List[Tuple[str, str]],
+                        ) -> List[Tuple[str, str]]:
+        """Select (symbol, package) pairs to index, e.g. to drop duplicates."""
+        return pairs
+
+    def _scan_reexports(self) -> ReexportGraph:
+        return scan_reexports(self.lib_directory, lambda f: (
+            self._filename_to_module(f) or (None, False))[0],
+            exclude_dirs=self.exclude_dirs)
+
+    def _normalize_filename(self, filename: str) -> Optional[str]:
+        """Normalize a filename (relative to lib_directory) in ctags output
+        into a path to the module, or None if it should not be indexed."""
+        return filename
 
 
 class BuiltinCTagsStrategy(CTagsStrategy):
-    lib_directory = sysconfig.get_paths()['stdlib']
-    ctags_options = '--exclude="site-packages"'
+    lib_directory = _lazy_classattr(lambda: sysconfig.get_paths()['stdlib'])
+    exclude_dirs = ('site-packages',)
 
 
 class SitePackagesCTagsStrategy(CTagsStrategy):
-    lib_directory = sysconfig.get_paths()['purelib']  # site-packages
+    lib_directory = _lazy_classattr(
+        lambda: sysconfig.get_paths()['purelib'])  # site-packages
+
+
+def _find_typeshed_stdlib() -> Optional[str]:
+    """Find a snapshot of typeshed stdlib stubs bundled with installed tools
+    (e.g. mypy, jedi), without importing them."""
+    import importlib.util
+    for package, subdir in [
+        ('mypy', 'typeshed/stdlib'),
+        ('jedi', 'third_party/typeshed/stdlib'),
+        ('typeshed_client', 'typeshed'),
+    ]:
+        try:
+            spec = importlib.util.find_spec(package)
+        except (ImportError, ValueError):
+            continue
+        for location in (spec and spec.submodule_search_locations) or []:
+            path = os.path.join(location, subdir)
+            if os.path.isdir(path):
+                return path
+    return None
+
+
+def _read_typeshed_versions(directory: str) -> Dict[str, Tuple[Tuple[int, ...],
+                                                            Tuple[int, ...]]]:
+    """Read `stdlib/VERSIONS` of typeshed, i.e. the range of python versions
+    that have each module, e.g. {'asyncio.taskgroups': ((3, 11), (99,))}."""
+    def _version(v: str, default: Tuple[int, ...]) -> Tuple[int, ...]:
+        return tuple(int(x) for x in v.split('.')) if v else default
+    versions = {}
+    try:
+        with open(os.path.join(directory, 'VERSIONS')) as f:
+            for line in f:
+                line = line.partition('#')[0].strip()
+                module, _, span = line.partition(':')
+                if not span:
+                    continue
+                lo, _, hi = span.strip().partition('-')
+                try:
+                    versions[module.strip()] = (_version(lo, (0,)),
+                                                _version(hi, (99,)))
+                except ValueError:
+                    continue
+    except OSError:
+        pass   # old snapshots have version directories instead
+    return versions
+
+
+class TypeshedCTagsStrategy(CTagsStrategy):
+    """Index typeshed stubs for the standard library, which give public paths
+    for symbols implemented in C extensions (e.g. math, _socket)."""
+    lib_directory = _lazy_classattr(_find_typeshed_stdlib)
+    exclude_dirs = ('@python2', '_typeshed')
+    _versions = None   # see _read_typeshed_versions(), read lazily
+
+    def _normalize_filename(self, filename: str) -> Optional[str]:
+        # Old snapshots of typeshed have version directories: stdlib/2and3/*.pyi
+        # or stdlib/3.7/*.pyi (for python 3.7+ only)
+        version, _, rest = filename.partition('/')
+        if version == '2':
+            return None  # python2-only
+        if rest and version == '2and3':
+            return rest
+        if rest and re.match(r'^\d+(\.\d+)?$', version):
+            if tuple(map(int, version.split('.'))) > sys.version_info[:2]:
+                return None  # not in the running python
+            return rest
+        return filename
+
+    def _filename_to_module(self, filename: str) -> Optional[Tuple[str, bool]]:
+        module = super()._filename_to_module(filename)
+        if module is None or not self._is_available(module[0]):
+            return None
+        return module
+
+    def _is_available(self, module: str) -> bool:
+        """Whether the running python has the module, according to VERSIONS.
+        `_typeshed` only exists for type checkers, not at runtime."""
+        if module.partition('.')[0] == '_typeshed':
+            return False
+        versions = self._versions
+        if versions is None:
+            versions = self._versions = _read_typeshed_versions(
+                self.lib_directory)
+        parts = module.split('.')
+        for i in range(len(parts), 0, -1):   # the most specific one
+            span = versions.get('.'.join(parts[:i]))
+            if span is not None:
+                return span[0] <= sys.version_info[:2] <= span[1]
+        return True
+
+    def _select_entries(self, pairs: List[Tuple[str, str]],
+                        ) -> List[Tuple[str, str]]:
+        # Symbols of C modules (e.g. _socket.socket) are usually re-exported
+        # by a public module (socket.socket), which should be used instead.
+        public = set(symbol for (symbol, package) in pairs
+                     if is_public(package, symbol))
+        return [(symbol, package) for (symbol, package) in pairs
+                if symbol not in public or
+                is_public(package, symbol)]
+
+
+class IntrospectionStrategy(IndexedStrategy):
+    """Index public names of compiled modules that have neither sources nor
+    stubs, by importing them in sandboxed subprocesses (see introspect.py).
+    The result is cached per version of distributions."""
+
+    lib_directories = _lazy_classattr(lambda: sorted(set(
+        sysconfig.get_paths()[k] for k in ('purelib', 'platlib'))))
+
+    def __init__(self, workers: int = 4, timeout: float = 10.0,
+                 memory_limit: int = 2 << 30, cache_path: Optional[str] = None):
+        self._options = dict(workers=workers, timeout=timeout,
+                             memory_limit=memory_limit)
+        self._cache_path = cache_path
+        self.reindex()
+
+    def reindex(self):
+        import concurrent.futures
+        if self.is_building():
+            return   # coalesce; subprocesses cannot be cancelled safely
+        # build index in a background thread without blocking UI.
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='autoimport-introspect')
+        self._future = executor.submit(self._build_database)
+        executor.shutdown(wait=False)
+
+    def _build_database(self) -> None:
+        from .. import introspect
+        try:
+            t0 = time.perf_counter()
+            modules: Dict[str, Optional[str]] = {}
+            for directory in self.lib_directories:
+                modules.update(introspect.find_compiled_modules(directory))
+            names = introspect.introspect_many(
+                modules, cache=introspect.IntrospectionCache(self._cache_path),
+                **self._options)
+            tags = _build_tags((symbol, module)
+                               for (module, symbols) in names.items()
+                               for symbol in symbols)
+            self._set_index(Index(tags, _build_members_index(tags)))
+            stats.record_index(type(self).__name__,
+                               build_time=time.perf_counter() - t0,
+                               modules=len(names), symbols=len(tags),
+                               memory=stats.estimate_size(tags))
+        except Exception as e:
+            # Note: vim cannot be called from this thread; see index_status()
+            self._error = str(e) or type(e).__name__
 
 
 # -----------------------------------------------------------------------------
@@ -346,7 +1128,11 @@ class SitePackagesCTagsStrategy(CTagsStrategy):
 # TODO: Make this list configurable and overridable by users.
 
 import collections, importlib, fnmatch
-DB: Dict[str, List[PyImport]] = collections.defaultdict(list)
+# Note: DB is filled at once (see _build_database), and never mutated again
+# so that it can be read from any thread without locking.
+DB: Dict[str, List[PyImport]] = {}
+_DB_LOCK = threading.Lock()
+_DB_BUILT = threading.Event()
 
 ALL = lambda pkg: importlib.import_module(pkg).__all__  # type: ignore
 DIR = lambda pkg: [s for s in dir(importlib.import_module(pkg))
@@ -421,7 +1207,20 @@ DB_MODULES_IMPORT_AS = {
     'matplotlib.pyplot': 'plt', 'matplotlib': 'mpl',
 }
 
-def _build_database():
+def _build_database() -> Dict[str, List[PyImport]]:
+    """Build the database if not built yet, and return it."""
+    if DB and _DB_BUILT.is_set():
+        return DB   # fast path, without locking
+    with _DB_LOCK:
+        if not DB:   # may have been built by another thread meanwhile
+            DB.update(_create_database())
+        _DB_BUILT.set()
+    return DB
+
+
+def _create_database() -> Dict[str, List[PyImport]]:
+    t0 = time.perf_counter()
+    db: Dict[str, List[PyImport]] = collections.defaultdict(list)
     for pkg, symbols in DB_MODULES_BUILTIN.items():
         if callable(symbols):
             try:
@@ -430,14 +1229,17 @@ def _build_database():
                 symbols = None
         for s in (symbols or []):
             # from {pkg} import {s}
-            DB[s].append(PyImport(package=pkg, symbol=s))
+            db[s].append(PyImport(package=pkg, symbol=s))
         # import {pkg}
-        DB[pkg].append(PyImport(package=pkg))
+        db[pkg].append(PyImport(package=pkg))
 
     for s in DB_MODULES_IMPORT:
         # import {s}
-        DB[s].append(PyImport(package=s))
+        db[s].append(PyImport(package=s))
     for pkg, s in DB_MODULES_IMPORT_AS.items():
         # import {pkg} as {s}
-        DB[s].append(PyImport(package=pkg, alias=s))
-    return DB
+        db[s].append(PyImport(package=pkg, alias=s))
+
+    stats.record_index('DB', build_time=time.perf_counter() - t0,
+                       symbols=len(db), memory=stats.estimate_size(db))
+    return dict(db)
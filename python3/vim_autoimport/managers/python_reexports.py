@@ -0,0 +1,221 @@
+"""vim_autoimport.managers.python_reexports
+
+Static analysis of re-exports in `__init__.py` files (and modules that are
+star-imported by them), e.g.
+
+    # pkg/__init__.py
+    from ._internal.foo import Foo
+    from .bar import *
+    __all__ = ['Foo', ...]
+
+so that `Foo` (defined in `pkg._internal.foo`) can be imported from its
+public path, `from pkg import Foo`, without importing anything.
+"""
+
+import ast
+import collections
+import fnmatch
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+Name = Tuple[str, str]   # (module, name)
+
+
+def is_public(module: str, name: str) -> bool:
+    return not name.startswith('_') and \
+        not any(part.startswith('_') for part in module.split('.'))
+
+
+class ReexportGraph:
+    """A graph of re-exports, where an edge (module, name) -> (package, alias)
+    means that `package` re-exports `name` of `module` as `alias`."""
+
+    def __init__(self):
+        self.edges: Dict[Name, List[Name]] = collections.defaultdict(list)
+        self.star_importers: Dict[str, List[str]] = collections.defaultdict(list)
+        self.all: Dict[str, Set[str]] = {}   # module -> __all__
+        self._cache: Dict[Name, List[Name]] = {}
+
+    def add_package(self, package: str, source: str):
+        """Add re-exports from the source code of `package/__init__.py`."""
+        self.add_module(package, source, is_package=True)
+
+    def add_module(self, module: str, source: str, is_package: bool = False):
+        """Add re-exports (and __all__) from the source code of the module,
+        e.g. one that is star-imported by a package."""
+        try:
+            tree = ast.parse(source)
+        except (SyntaxError, ValueError, SystemError, RecursionError):
+            return  # e.g. python2 sources, or too deeply nested
+
+        dunder_all = _parse_dunder_all(tree)
+        if dunder_all is not None:
+            self.all[module] = dunder_all
+
+        # relative imports are relative to the package of the module
+        package = module if is_package else module.rpartition('.')[0]
+        for node in tree.body:   # only top-level statements
+            if not isinstance(node, ast.ImportFrom) or not node.module:
+                continue  # from . import submodule, etc.
+            if node.level:
+                base = package.split('.') if package else []
+                if node.level - 1 >= len(base):
+                    continue
+                base = base[:len(base) - (node.level - 1)]
+                imported = '.'.join(base + [node.module])
+            else:
+                imported = node.module
+            for alias in node.names:
+                if alias.name == '*':
+                    self.star_importers[imported].append(module)
+                else:
+                    self.edges[(imported, alias.name)].append(
+                        (module, alias.asname or alias.name))
+        self._cache.clear()
+
+    def _exports(self, module: str, name: str) -> bool:
+        """Whether `from module import *` imports the name."""
+        if module in self.all:
+            return name in self.all[module]
+        return not name.startswith('_')
+
+    def public_path(self, module: str, name: str) -> Name:
+        """Get the shortest public path to import the name defined in the
+        module, e.g. ('pkg._internal.foo', 'Foo') -> ('pkg', 'Foo').
+        Aliases (e.g. `from .foo import Foo as F`) are not considered."""
+        return self.public_paths(module, name)[0]
+
+    def public_paths(self, module: str, name: str) -> List[Name]:
+        """Get the shortest public path that keeps the name (see public_path),
+        followed by the shortest public path of each alias of it."""
+        origin = (module, name)
+        if origin in self._cache:
+            return self._cache[origin]
+
+        best: Dict[str, Name] = {name: origin}   # name -> the shortest path
+        visited = {origin}
+        queue = collections.deque([origin])
+        while queue:
+            node = queue.popleft()
+            m, n = node
+            targets = list(self.edges.get(node, []))
+            if self._exports(m, n):   # `*` imports only the exported names
+                targets += [(p, n) for p in self.star_importers.get(m, [])]
+            for target in targets:
+                if target in visited or not self._exports(*target):
+                    continue
+                visited.add(target)
+                queue.append(target)
+                alias = target[1]
+                if alias not in best or _rank(target) < _rank(best[alias]):
+                    best[alias] = target
+
+        paths = [best.pop(name)] + [best[alias] for alias in sorted(best)
+                                    if is_public(*best[alias])]
+        self._cache[origin] = paths
+        return paths
+
+    def publicize(self, entries: Iterable[Tuple[str, str]],
+                  ) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+        """Map (symbol, package) pairs to their public paths. Aliases are
+        added as separate entries, e.g. (DataFrame, pkg) and (DF, pkg).
+
+        Returns the public paths, and the definition sites that are public
+        but re-exported by a shorter path (e.g. `requests.models.Response`
+        of `requests.Response`), which should be kept, but not preferred.
+        Private definition sites are replaced."""
+        result, shadowed = [], []
+        for symbol, package in entries:
+            paths = self.public_paths(package, symbol)
+            for public_package, public_symbol in paths:
+                result.append((public_symbol, public_package))
+            if paths[0] != (package, symbol) and is_public(package, symbol):
+                shadowed.append((symbol, package))
+        return result, shadowed
+
+def _rank(node: Name):
+    module, name = node
+    return (not is_public(module, name), module.count('.'), module, name)
+
+
+def _parse_dunder_all(tree: ast.Module) -> Optional[Set[str]]:
+    names: Optional[Set[str]] = None
+    for node in tree.body:
+        if isinstance(node, ast.Assign):
+            targets, value = node.targets, node.value
+        elif isinstance(node, (ast.AugAssign, ast.AnnAssign)):
+            targets, value = [node.target], node.value
+        else:
+            continue
+        if not any(isinstance(t, ast.Name) and t.id == '__all__' for t in targets):
+            continue
+        if not isinstance(value, (ast.List, ast.Tuple)):
+            continue  # dynamic, cannot analyze
+        elts = set(e.value for e in value.elts
+                   if isinstance(e, ast.Constant) and isinstance(e.value, str))
+        if isinstance(node, ast.AugAssign):
+            names = (names or set()) | elts
+        else:
+            names = elts
+    return names
+
+
+def scan_reexports(lib_directory: str,
+                   module_name: Callable[[str], Optional[str]],
+                   exclude_dirs: Iterable[str] = (),
+                   ) -> ReexportGraph:
+    """Build a re-export graph from all `__init__.py` (or `__init__.pyi`)
+    under the directory, and the modules star-imported by them (for their
+    `__all__`). `module_name` converts a relative filename into a
+    full module name (e.g. pkg/__init__.py -> pkg), or None to ignore it.
+    Directories whose names match any of `exclude_dirs` (glob patterns, as
+    in `ctags --exclude`) are not scanned, e.g. site-packages."""
+    exclude_dirs = tuple(exclude_dirs)
+    graph = ReexportGraph()
+    package_dirs: Dict[str, str] = {}   # package -> directory
+    for dirpath, dirnames, filenames in os.walk(lib_directory):
+        dirnames[:] = [d for d in dirnames
+                       if not d.startswith('.') and d != '__pycache__' and
+                       not any(fnmatch.fnmatch(d, p) for p in exclude_dirs)]
+        for init in ('__init__.pyi', '__init__.py'):   # stubs first
+            if init in filenames:
+                break
+        else:
+            continue
+        path = os.path.join(dirpath, init)
+        package = module_name(os.path.relpath(path, lib_directory)
+                              .replace(os.sep, '/'))
+        if not package:
+            continue
+        package_dirs[package] = dirpath
+        source = _read_source(path)
+        if source and 'import' in source:
+            graph.add_package(package, source)
+
+    # `from .core import *` imports only names in `__all__` of pkg/core.py
+    scanned = set(package_dirs)
+    queue = list(graph.star_importers)
+    while queue:
+        module = queue.pop()
+        if module in scanned:
+            continue
+        scanned.add(module)
+        parent, _, name = module.rpartition('.')
+        if parent not in package_dirs:
+            continue
+        for ext in ('.pyi', '.py'):   # stubs first
+            source = _read_source(os.path.join(package_dirs[parent], name + ext))
+            if source is not None:
+                break
+        if source and ('__all__' in source or 'import' in source):
+            graph.add_module(module, source)
+            queue.extend(m for m in graph.star_importers if m not in scanned)
+    return graph
+
+
+def _read_source(path: str) -> Optional[str]:
+    try:
+        with open(path, encoding='utf-8', errors='ignore') as f:
+            return f.read()
+    except OSError:
+        return None
@@ -0,0 +1,107 @@
+import sys
+
+import pytest
+
+from vim_autoimport.managers.python_reexports import ReexportGraph, scan_reexports
+
+
+def testPublicPath():
+    graph = ReexportGraph()
+    graph.add_package('pkg', '\n'.join([
+        'from ._internal.foo import Foo',
+        'from .utils import *',
+        'from pkg.sub.deep import Deep as Alias',
+        'from ._private import _Hidden',
+    ]))
+    graph.add_package('pkg.sub', 'from .deep import Deep')
+    graph.add_package('pkg.sub.pkg2', 'from ..deep import Deep')
+
+    assert graph.public_path('pkg._internal.foo', 'Foo') == ('pkg', 'Foo')
+    assert graph.public_path('pkg.utils', 'helper') == ('pkg', 'helper')
+    assert graph.public_path('pkg.utils', '_private') == ('pkg.utils', '_private')
+    # shortest public path that keeps the name, and then aliases
+    assert graph.public_path('pkg.sub.deep', 'Deep') == ('pkg.sub', 'Deep')
+    assert graph.public_paths('pkg.sub.deep', 'Deep') == \
+        [('pkg.sub', 'Deep'), ('pkg', 'Alias')]
+    # public definition sites are kept (but not preferred); private ones not
+    assert graph.publicize([('Deep', 'pkg.sub.deep')]) == \
+        ([('Deep', 'pkg.sub'), ('Alias', 'pkg')], [('Deep', 'pkg.sub.deep')])
+    assert graph.publicize([('Foo', 'pkg._internal.foo')]) == \
+        ([('Foo', 'pkg')], [])
+    assert graph.public_path('pkg._private', '_Hidden') == ('pkg._private', '_Hidden')
+    # not re-exported at all
+    assert graph.public_path('other.mod', 'X') == ('other.mod', 'X')
+
+
+def testDunderAll():
+    graph = ReexportGraph()
+    graph.add_package('pkg', '\n'.join([
+        'from .a import A, B',
+        'from .c import *',
+        '__all__ = ["A"]',
+        '__all__ += ["C"]',
+    ]))
+    assert graph.all['pkg'] == {'A', 'C'}
+    assert graph.public_path('pkg.a', 'A') == ('pkg', 'A')
+    assert graph.public_path('pkg.a', 'B') == ('pkg.a', 'B')   # not in __all__
+    assert graph.public_path('pkg.c', 'C') == ('pkg', 'C')
+    assert graph.public_path('pkg.c', 'D') == ('pkg.c', 'D')
+
+    # a package with __all__ only exports what is listed, through `*`
+    graph.add_package('api', 'from pkg import *')
+    assert graph.public_path('pkg.a', 'A') == ('api', 'A')
+    assert graph.public_path('pkg.a', 'B') == ('pkg.a', 'B')
+
+    # `*` imports only names in __all__ of the star-imported module as well
+    graph.add_package('np', 'from .core import *')
+    graph.add_module('np.core', '\n'.join([
+        'from .numeric import *',
+        'from .multiarray import zeros',
+        '__all__ = ["A", "zeros"]',
+    ]))
+    assert graph.public_path('np.core', 'A') == ('np', 'A')
+    assert graph.public_path('np.core', 'B') == ('np.core', 'B')
+    assert graph.public_path('np.multiarray', 'zeros') == ('np', 'zeros')
+    assert graph.star_importers['np.numeric'] == ['np.core']   # relative
+
+    # invalid sources are ignored
+    graph.add_package('broken', 'from . import (')
+    assert 'broken' not in graph.all
+
+
+def testScanReexports(tmp_path):
+    (tmp_path / 'lib' / '_impl').mkdir(parents=True)
+    (tmp_path / 'lib' / '__init__.py').write_text('from ._impl.core import Core\n')
+    (tmp_path / 'lib' / '__init__.pyi').write_text('from ._impl.core import Core as Core\n')
+    (tmp_path / 'lib' / '_impl' / '__init__.py').write_text('')
+
+    def module_name(filename):
+        assert filename.startswith('lib/')
+        return filename.rpartition('/')[0].replace('/', '.')
+
+    graph = scan_reexports(str(tmp_path), module_name)
+    assert dict(graph.edges) == {('lib._impl.core', 'Core'): [('lib', 'Core')]}
+    assert graph.public_path('lib._impl.core', 'Core') == ('lib', 'Core')
+
+    # __all__ of star-imported modules (not __init__), e.g. numpy
+    (tmp_path / 'lib' / '_impl' / '__init__.py').write_text('from .api import *\n')
+    (tmp_path / 'lib' / '_impl' / 'api.py').write_text('\n'.join([
+        '__all__ = ["A"]', 'def A(): pass', 'def B(): pass']))
+    graph = scan_reexports(str(tmp_path), module_name)
+    assert graph.all['lib._impl.api'] == {'A'}
+    assert graph.public_path('lib._impl.api', 'A') == ('lib._impl', 'A')
+    assert graph.public_path('lib._impl.api', 'B') == ('lib._impl.api', 'B')
+
+    # excluded directories (e.g. site-packages under stdlib) are not scanned
+    (tmp_path / 'lib' / 'site-packages' / 'other').mkdir(parents=True)
+    (tmp_path / 'lib' / 'site-packages' / 'other' / '__init__.py').write_text(
+        'from .impl import Other\n')
+    graph = scan_reexports(str(tmp_path), module_name)
+    assert ('lib.site-packages.other.impl', 'Other') in graph.edges
+    graph = scan_reexports(str(tmp_path), module_name,
+                           exclude_dirs=['site-*'])
+    assert ('lib.site-packages.other.impl', 'Other') not in graph.edges
+
+
+if __name__ == '__main__':
+    pytest.main(["-s", "-v"] + sys.argv)
@@ -5,6 +5,8 @@ from pathlib import Path
 
 import pytest
 
+from vim_autoimport.managers.python_reexports import ReexportGraph
+
 try:
     from blessed import Terminal
     term = Terminal()
@@ -14,12 +16,6 @@ except:
     YELLOW = GREEN = CYAN = NORMAL = ''
 
 
-def _wrap_as_future(obj):
-    f = asyncio.Future()
-    f.set_result(obj)
-    return f
-
-
 def testPyImport():
     from vim_autoimport.managers.python import PyImport
     assert str(PyImport("tensorflow")) == "import tensorflow"
@@ -38,6 +34,11 @@ def testPyImport():
     assert not (PyImport("lib", "numpy", "np") == PyImport("lib", "numpy"))
     assert hash(PyImport("numpy", symbol="linalg", alias="la"))
 
+    for statement in ("import numpy", "import numpy as np",
+                      "from os import path", "from a.b import c as d"):
+        assert str(PyImport.parse(statement)) == statement
+    assert PyImport.parse("import") is None
+
 
 def testDatabase():
     from vim_autoimport.managers.python import DB, _build_database
@@ -111,7 +112,9 @@ def testImportResolveBasic(ctags_fixture):
     #==========================================================================
     assert resolve("antigravity") == "import antigravity"  # builtin :)
     assert resolve("vim_autoimport.managers.python.PythonImportManager") \
-        == "import vim_autoimport"  # itself?  # TODO import full subpackage
+        == "import vim_autoimport.managers.python"  # the deepest submodule
+    assert resolve("vim_autoimport.managers.unknown") == \
+        "import vim_autoimport.managers"
 
     #==========================================================================
     section("don't know")
@@ -120,10 +123,38 @@ def testImportResolveBasic(ctags_fixture):
     assert resolve("_unknown.prefix.sys") == None
 
 
+def testModuleTree(tmp_path, monkeypatch):
+    from vim_autoimport.managers.python import ImportableModuleStrategy
+    for d in ('toppkg/sub/deep', 'toppkg/_private'):
+        (tmp_path / d).mkdir(parents=True)
+    for d in ('toppkg', 'toppkg/sub', 'toppkg/sub/deep', 'toppkg/_private'):
+        (tmp_path / d / '__init__.py').write_text('raise ImportError')
+    (tmp_path / 'toppkg' / 'sub' / 'mod.py').write_text('raise ImportError')
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    strategy = ImportableModuleStrategy()
+    tree = strategy.module_tree
+    assert tree.children['toppkg']._children is None  # not expanded yet
+
+    assert str(strategy('toppkg.sub.mod')) == 'import toppkg.sub.mod'
+    assert str(strategy('toppkg.sub.deep')) == 'import toppkg.sub.deep'
+    assert strategy('toppkg.sub.mod.Class') is None
+    assert strategy('toppkg.nonexistent') is None
+    assert tree.children['toppkg'].children['_private']._children is None
+    assert strategy.members('toppkg.sub') == ['deep', 'mod']
+    assert strategy.members('toppkg', prefix='s') == ['sub']
+
+
 @pytest.fixture
 def ctags_fixture(mocker):
     """A fixture mocking ctags output for SitePackagesCTagsStrategy."""
     from vim_autoimport.managers.python import CTagsStrategy
+    from vim_autoimport.managers.python_reexports import ReexportGraph
+    from vim_autoimport import vim_utils
+    # ctags strategies are enabled only on neovim with ctags installed.
+    mocker.patch.object(vim_utils, 'is_neovim', True)
+    mocker.patch('shutil.which', return_value='/usr/bin/ctags')
+
     async def ctags_mock():
         """full ctags is slow; mock ctags output line by line."""
         yield '!This is a comment line -- should be ignored'
@@ -137,7 +168,10 @@ def ctags_fixture(mocker):
         yield '\t'.join(['John', 'names/Lennon.py', '/^class John', 'c'])
         yield '\t'.join(['John', 'names/Doe.py', '/^class John', 'c'])
     mocker.patch.object(CTagsStrategy, '_run_ctags',
-                        side_effect=lambda: _wrap_as_future(ctags_mock()))
+                        side_effect=lambda: ctags_mock())
+    # re-exports would be scanned from the filesystem, which is mocked as well
+    mocker.patch.object(CTagsStrategy, '_scan_reexports',
+                        side_effect=lambda: ReexportGraph())
 
 
 
@@ -193,6 +227,544 @@ def testSitePackagesCTags(ctags_fixture, mocker):
     assert resolve("John") == "from names.Doe import John"  # D precedes L
 
 
+@pytest.mark.timeout(1.0)
+def testLearnedConventions(ctags_fixture, mocker):
+    from vim_autoimport import conventions, vim_utils
+    from vim_autoimport.managers.python import PythonImportManager
+    table = conventions.ConventionTable()
+    for _ in range(3):
+        conventions.mine_source('\n'.join([
+            'import tensorflow.compat.v1 as tf',
+            'from names.Lennon import John',
+        ]), table)
+    conventions.set_table(table)
+
+    manager = PythonImportManager()
+    asyncio.get_event_loop().run_until_complete(
+        manager.wait_until_strategies_ready())
+    ask_user = mocker.patch.object(vim_utils, 'ask_user', return_value=1)
+
+    # learned aliases that are not in the builtin database
+    assert manager.resolve_import('tf') == 'import tensorflow.compat.v1 as tf'
+    # the dominant one is picked among ambiguous candidates, without asking
+    assert manager.resolve_import('John') == 'from names.Lennon import John'
+    assert manager.resolve_unambiguous('John') == 'from names.Lennon import John'
+    assert [str(c) for c in manager.resolve_many(['John'])['John']] == \
+        ['from names.Lennon import John', 'from names.Doe import John']
+    assert not ask_user.called
+
+
+@pytest.mark.timeout(2.0)
+def testReindex(ctags_fixture, mocker):
+    from vim_autoimport.managers.python import CTagsStrategy
+    from vim_autoimport.managers.python import PythonImportManager
+    from vim_autoimport.managers.python import SitePackagesCTagsStrategy
+    loop = asyncio.get_event_loop()
+    run_ctags = CTagsStrategy._run_ctags
+    def site_packages(manager):
+        return [s for s in manager._strategies
+                if isinstance(s, SitePackagesCTagsStrategy)][0]
+
+    # a second manager (e.g. after reload) joins the builds of the first one
+    m1, m2 = PythonImportManager(), PythonImportManager()
+    n = sum(isinstance(s, CTagsStrategy) for s in m1._strategies)
+    loop.run_until_complete(m1.wait_until_strategies_ready())
+    loop.run_until_complete(m2.wait_until_strategies_ready())
+    assert run_ctags.call_count == n
+    index = site_packages(m1)._index
+    assert index is not None and site_packages(m2)._index is index
+    assert m1.index_status()['SitePackagesCTagsStrategy'] == \
+        {'state': 'ready', 'error': None, 'symbols': len(index.tags)}
+
+    # concurrent requests are coalesced, and indexes are swapped as a whole
+    m1.reindex()
+    m2.reindex()
+    assert site_packages(m1).status()['state'] == 'building'
+    assert site_packages(m1)._index is index  # still usable while building
+    loop.run_until_complete(m1.wait_until_strategies_ready())
+    loop.run_until_complete(m2.wait_until_strategies_ready())
+    assert run_ctags.call_count == 2 * n
+    assert site_packages(m1)._index is not index
+    assert site_packages(m1)._index is site_packages(m2)._index
+    assert m1.resolve_import("SomeClass") == \
+        "from lib2.models.some_class import SomeClass"
+
+
+@pytest.mark.timeout(2.0)
+def testReindexFailure(ctags_fixture, mocker):
+    from vim_autoimport.managers import StrategyFailedError
+    from vim_autoimport.managers.python import CTagsStrategy
+    from vim_autoimport.managers.python import PythonImportManager
+    from vim_autoimport.managers.python import SitePackagesCTagsStrategy
+    loop = asyncio.get_event_loop()
+    ctags_mock = CTagsStrategy._run_ctags.side_effect
+    CTagsStrategy._run_ctags.side_effect = RuntimeError("ctags crashed")
+
+    manager = PythonImportManager()
+    strategy = [s for s in manager._strategies
+                if isinstance(s, SitePackagesCTagsStrategy)][0]
+    loop.run_until_complete(manager.wait_until_strategies_ready())
+    assert strategy.status() == {'state': 'failed', 'error': 'ctags crashed',
+                                 'symbols': 0}
+    with pytest.raises(StrategyFailedError):
+        strategy.candidates("SomeClass")
+    assert manager.resolve_import("SomeClass") is None
+    assert manager.resolve_import("os") == "import os"
+
+    # a new manager retries the failed build, rather than joining it
+    CTagsStrategy._run_ctags.side_effect = ctags_mock
+    manager = PythonImportManager()
+    loop.run_until_complete(manager.wait_until_strategies_ready())
+    assert manager.resolve_import("SomeClass") == \
+        "from lib2.models.some_class import SomeClass"
+
+
+@pytest.mark.timeout(2.0)
+def testReindexCancelsCtags(mocker):
+    from vim_autoimport.managers.python import SitePackagesCTagsStrategy
+    loop = asyncio.get_event_loop()
+    mocker.patch.object(SitePackagesCTagsStrategy, '_scan_reexports',
+                        side_effect=lambda: ReexportGraph())
+    procs = []
+
+    async def slow_ctags(self):
+        self._proc = mocker.Mock(returncode=None)
+        procs.append(self._proc)
+        async def _lines():
+            await asyncio.sleep(60)   # ctags in progress
+            yield ''
+        return _lines()
+    mocker.patch.object(SitePackagesCTagsStrategy, '_run_ctags',
+                        autospec=True, side_effect=slow_ctags)
+
+    strategy = SitePackagesCTagsStrategy()
+    loop.run_until_complete(asyncio.sleep(0.01))
+    assert strategy.status()['state'] == 'building' and len(procs) == 1
+
+    async def fast_ctags(self):
+        return _ctags_lines(('SomeClass', 'lib2/some_class.py', 'c'))
+    SitePackagesCTagsStrategy._run_ctags.side_effect = fast_ctags
+    strategy.reindex()
+    loop.run_until_complete(strategy._future)
+    procs[0].kill.assert_called_once_with()  # the in-flight ctags is killed
+    assert str(strategy("SomeClass")) == "from lib2.some_class import SomeClass"
+
+
+def _run_threads(target, n=8):
+    """Run the target in n threads at once, and re-raise their exceptions."""
+    import threading
+    barrier, errors = threading.Barrier(n), []
+    def _run():
+        try:
+            barrier.wait()
+            target()
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=_run) for _ in range(n)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    if errors:
+        raise errors[0]
+
+
+@pytest.mark.timeout(10.0)
+def testLazyStartup(mocker):
+    """Importing the package, or creating a manager, should not do any work
+    (e.g. importing managers, building indexes) until it is needed."""
+    import subprocess
+    script = '\n'.join([
+        'import sys; sys.modules["vim"] = type(sys)("vim")',
+        'import vim_autoimport',
+        'assert "vim_autoimport.managers" not in sys.modules, "managers"',
+        'assert "json" not in sys.modules, "json"',
+        'import vim_autoimport.managers.python',
+        'assert "multiprocessing" not in sys.modules, "multiprocessing"',
+    ])
+    proc = subprocess.run([sys.executable, '-c', script],
+                          cwd=str(Path(__file__).resolve().parents[2]),
+                          stderr=subprocess.PIPE)
+    assert proc.returncode == 0, proc.stderr.decode()
+
+    from vim_autoimport.managers import python
+    create_strategies = mocker.spy(python.PythonImportManager, 'create_strategies')
+    manager = python.PythonImportManager()
+    assert create_strategies.call_count == 0
+    assert manager.resolve_import('os') == 'import os'
+    manager.resolve_import('sys')
+    assert create_strategies.call_count == 1
+
+
+@pytest.mark.timeout(5.0)
+def testGetManagerConcurrently(mocker, monkeypatch):
+    from vim_autoimport import managers
+    from vim_autoimport.managers import python
+    monkeypatch.setattr(managers, 'INSTANCES', {})
+    monkeypatch.setattr(python, 'DB', {})
+    create_database = mocker.spy(python, '_create_database')
+    init = mocker.spy(python.PythonImportManager, '__init__')
+
+    results = []
+    _run_threads(lambda: results.append(managers.get_manager('python')))
+    assert len(results) == 8 and all(m is results[0] for m in results)
+    assert init.call_count == 1
+    assert create_database.call_count == 0   # not until the first query
+
+    # the database is built only once, even if queried concurrently
+    _run_threads(lambda: results[0].resolve_import('np'))
+    assert create_database.call_count == 1
+
+    monkeypatch.setattr(python, 'DB', {})
+    fresh = [python.PythonImportManager() for _ in range(8)]
+    _run_threads(lambda: fresh.pop().resolve_import('np'))
+    assert create_database.call_count == 2
+    assert all(m.resolve_import('np') == 'import numpy as np' for m in results)
+
+
+@pytest.mark.timeout(5.0)
+def testFirstQueryFromThread(ctags_fixture):
+    """Strategies created by a query from a thread other than the loop's do
+    not touch asyncio there; ctags indexes are not ready until built."""
+    import threading
+    from vim_autoimport.managers.python import PythonImportManager
+    from vim_autoimport.managers.python import SitePackagesCTagsStrategy
+    loop = asyncio.get_event_loop()
+    manager = PythonImportManager()
+
+    results = []
+    thread = threading.Thread(target=lambda: results.extend([
+        manager.resolve_import('SomeClass'), manager.resolve_import('np'),
+        manager.suggest('Some')]))
+    thread.start()
+    thread.join()
+    assert results == [None, 'import numpy as np', {}]
+    strategy = [s for s in manager._strategies
+                if isinstance(s, SitePackagesCTagsStrategy)][0]
+    assert strategy.status()['state'] == 'not built'
+
+    # the build is started on the loop
+    loop.run_until_complete(asyncio.sleep(0.01))
+    loop.run_until_complete(manager.wait_until_strategies_ready())
+    assert manager.resolve_import('SomeClass') == \
+        'from lib2.models.some_class import SomeClass'
+
+
+@pytest.mark.timeout(10.0)
+def testConcurrentQueries(ctags_fixture, mocker):
+    """Hammer queries from many threads while indexes are (re)built."""
+    import random
+    import threading
+    from vim_autoimport.managers.python import PythonImportManager
+    loop = asyncio.get_event_loop()
+    manager = PythonImportManager()
+
+    symbols = ['SomeClass', 'some_class.SomeClass', 'John', 'np.zeros', 'os',
+               'lib2.models.some_class.Foo', 'vim_autoimport.managers', 'unknown']
+    done = threading.Event()
+    counts = []
+    def hammer():
+        rng, n = random.Random(), 0
+        while not done.is_set() or n < 100:
+            symbol = rng.choice(symbols)
+            r = manager.resolve_import(symbol)
+            assert r is None or r.startswith(('import ', 'from '))
+            assert isinstance(manager.suggest(symbol[:2]), dict)
+            assert symbol in manager.resolve_many([symbol])
+            assert isinstance(manager.members('lib2.models'), list)
+            n += 1
+        counts.append(n)
+
+    thread = threading.Thread(target=_run_threads, args=(hammer,))
+    thread.start()
+    try:
+        loop.run_until_complete(manager.wait_until_strategies_ready())
+        for _ in range(3):
+            manager.reindex()
+            loop.run_until_complete(asyncio.sleep(0.01))
+            loop.run_until_complete(manager.wait_until_strategies_ready())
+    finally:
+        done.set()
+        thread.join()
+    assert len(counts) == 8
+    # ambiguous symbols are not resolved (no prompt) off the main thread
+    results = []
+    _run_threads(lambda: results.append(manager.resolve_import('John')))
+    assert results == [None] * 8
+    assert manager.resolve_import("SomeClass") == \
+        "from lib2.models.some_class import SomeClass"
+
+
+def _ctags_lines(*tags):
+    async def _lines():
+        for symbol, filename, kind in tags:
+            yield '\t'.join([symbol, filename, '/^{}$/;"'.format(symbol), kind])
+    return _lines()
+
+
+def testCTagsStubs(tmp_path):
+    from vim_autoimport.managers.python import SitePackagesCTagsStrategy
+    from vim_autoimport.managers.python import TypeshedCTagsStrategy
+    strategy = SitePackagesCTagsStrategy.__new__(SitePackagesCTagsStrategy)
+    tags = asyncio.get_event_loop().run_until_complete(
+        strategy._create_database_from_stream(_ctags_lines(
+            # stubs take precedence over sources for the same module
+            ('Public', 'lib/core.py', 'c'),
+            ('_helper', 'lib/core.py', 'f'),
+            ('Public', 'lib/core.pyi', 'c'),
+            # compiled modules only have stubs
+            ('fast_sum', 'lib/_speedups.pyi', 'f'),
+            ('zeros', 'lib/__init__.pyi', 'f'),
+            # stub-only distributions (PEP 561)
+            ('DataFrame', 'pandas-stubs/core/frame.pyi', 'c'),
+            ('DataFrame', 'pandas/core/frame.py', 'c'),
+            ('_private', 'pandas/core/frame.py', 'f'),
+        )))
+    for k, v in sorted(tags.items()):
+        print("%-30s" % k, list(map(str, v)))
+
+    assert list(map(str, tags['Public'])) == ['from lib.core import Public']
+    assert '_helper' not in tags
+    assert list(map(str, tags['fast_sum'])) == ['from lib._speedups import fast_sum']
+    assert list(map(str, tags['zeros'])) == ['from lib import zeros']
+    assert list(map(str, tags['DataFrame'])) == \
+        ['from pandas.core.frame import DataFrame']
+    assert '_private' not in tags
+    assert not any('stubs' in k for k in tags)
+
+    # typeshed (old snapshots have version directories)
+    strategy = TypeshedCTagsStrategy.__new__(TypeshedCTagsStrategy)
+    strategy.lib_directory = str(tmp_path)   # no VERSIONS
+    tags = asyncio.get_event_loop().run_until_complete(
+        strategy._create_database_from_stream(_ctags_lines(
+            ('sqrt', 'math.pyi', 'f'),
+            ('socket', '2and3/_socket.pyi', 'c'),
+            ('socket', '2and3/socket.pyi', 'c'),
+            ('dup', '2and3/_socket.pyi', 'f'),
+            ('urlopen', '2/urllib2.pyi', 'f'),
+            ('field', '3.7/dataclasses.pyi', 'f'),
+            ('future', '3.99/future.pyi', 'f'),
+            ('SupportsRead', '_typeshed/__init__.pyi', 'c'),
+        )))
+    assert list(map(str, tags['sqrt'])) == ['from math import sqrt']
+    # public modules win over private C modules, if any
+    assert list(map(str, tags['socket'])) == \
+        ['import socket', 'from socket import socket']   # and the module
+    assert list(map(str, tags['dup'])) == ['from _socket import dup']
+    assert list(map(str, tags['field'])) == ['from dataclasses import field']
+    assert 'urlopen' not in tags
+    assert 'future' not in tags
+    assert 'SupportsRead' not in tags   # only for type checkers
+
+    # typeshed/stdlib/VERSIONS: modules not in the running python
+    (tmp_path / 'VERSIONS').write_text('\n'.join([
+        '# module: first-last python versions',
+        'asyncio: 3.4-',
+        'asyncio.future_module: 3.99-',
+        'distutils: 3.0-3.1  # removed',
+        'math: 3.0-',
+    ]))
+    strategy = TypeshedCTagsStrategy.__new__(TypeshedCTagsStrategy)
+    strategy.lib_directory = str(tmp_path)
+    tags = asyncio.get_event_loop().run_until_complete(
+        strategy._create_database_from_stream(_ctags_lines(
+            ('sqrt', 'math.pyi', 'f'),
+            ('gather', 'asyncio/tasks.pyi', 'f'),
+            ('future_fn', 'asyncio/future_module.pyi', 'f'),
+            ('setup', 'distutils/core.pyi', 'f'),
+        )))
+    assert list(map(str, tags['sqrt'])) == ['from math import sqrt']
+    assert list(map(str, tags['gather'])) == ['from asyncio.tasks import gather']
+    assert 'future_fn' not in tags
+    assert 'setup' not in tags
+
+
+def testCTagsReexports():
+    from vim_autoimport.managers.python import SitePackagesCTagsStrategy
+    from vim_autoimport.managers.python import _build_members_index
+    from vim_autoimport.managers.python_reexports import ReexportGraph
+    graph = ReexportGraph()
+    graph.add_package('lib', "from ._internal.core import Model, helper as h")
+    graph.add_package('lib._internal', "from .core import *")
+
+    strategy = SitePackagesCTagsStrategy.__new__(SitePackagesCTagsStrategy)
+    tags = asyncio.get_event_loop().run_until_complete(
+        strategy._create_database_from_stream(_ctags_lines(
+            ('Model', 'lib/_internal/core.py', 'c'),
+            ('helper', 'lib/_internal/core.py', 'f'),
+        ), reexports=graph))
+
+    # public paths win over private module paths
+    assert list(map(str, tags['Model'])) == ['from lib import Model']
+    # aliases are indexed as well as the real name
+    assert list(map(str, tags['h'])) == ['from lib import h']
+    assert list(map(str, tags['helper'])) == ['from lib._internal import helper']
+    assert 'h' in _build_members_index(tags)['lib']
+    assert 'lib._internal.core' not in tags
+
+
+def testScanReexportsExcludes(tmp_path, mocker):
+    """The scan of re-exports skips what ctags excludes, e.g. site-packages
+    which is under the stdlib directory."""
+    from vim_autoimport.managers.python import BuiltinCTagsStrategy
+    for pkg in ('json', 'site-packages/traitlets'):
+        (tmp_path / pkg).mkdir(parents=True)
+        (tmp_path / pkg / '__init__.py').write_text('from .impl import X\n')
+    mocker.patch.object(BuiltinCTagsStrategy, 'lib_directory', str(tmp_path))
+
+    strategy = BuiltinCTagsStrategy.__new__(BuiltinCTagsStrategy)
+    graph = strategy._scan_reexports()
+    assert list(graph.edges) == [('json.impl', 'X')]
+
+
+def testCTagsReexportsFromPublicModule():
+    """Re-exports from a public submodule keep its members, e.g. requests."""
+    from vim_autoimport.managers.python import SitePackagesCTagsStrategy
+    from vim_autoimport.managers.python import _build_members_index
+    from vim_autoimport.managers.python_reexports import ReexportGraph
+    graph = ReexportGraph()
+    graph.add_package('requests', "from .models import Request, Response")
+
+    strategy = SitePackagesCTagsStrategy.__new__(SitePackagesCTagsStrategy)
+    tags = asyncio.get_event_loop().run_until_complete(
+        strategy._create_database_from_stream(_ctags_lines(
+            ('Request', 'requests/models.py', 'c'),
+            ('Response', 'requests/models.py', 'c'),
+            ('PreparedRequest', 'requests/models.py', 'c'),
+        ), reexports=graph))
+
+    # the re-export is preferred, without being ambiguous
+    assert list(map(str, tags['Response'])) == ['from requests import Response']
+    # while the public definition site is kept
+    assert list(map(str, tags['models.Response'])) == ['from requests import models']
+    assert list(map(str, tags['requests.models'])) == ['import requests.models']
+    members = _build_members_index(tags)
+    assert members['requests.models'] == ['PreparedRequest', 'Request', 'Response']
+    assert members['requests'] == ['Request', 'Response', 'models']
+
+
+def testIntrospectionStrategy(tmp_path, mocker):
+    from vim_autoimport import introspect
+    from vim_autoimport.managers.python import IntrospectionStrategy
+    mocker.patch.object(introspect, 'find_compiled_modules',
+                        return_value={'fastlib.core': None})
+    mocker.patch.object(introspect, 'introspect',
+                        return_value=['fast_sum', 'FastArray'])
+
+    strategy = IntrospectionStrategy(cache_path=str(tmp_path / 'cache.json'))
+    strategy._future.result(timeout=5.0)
+    assert str(strategy('fast_sum')) == 'from fastlib.core import fast_sum'
+    assert str(strategy('core.FastArray')) == 'from fastlib import core'
+    assert strategy.members('fastlib.core') == ['FastArray', 'fast_sum']
+
+
+def testSuggestPartialIndexes():
+    """Indexes that are ready are used while the others are being built,
+    e.g. introspection can take minutes, or failed."""
+    from vim_autoimport.managers import python
+    ready, building, failed = (python.IndexedStrategy() for _ in range(3))
+    tags = python._build_tags([('fast_sum', 'fastlib.core')])
+    ready._set_index(python.Index(tags, python._build_members_index(tags)))
+    failed._error = 'crashed'
+
+    class Manager(python.PythonImportManager):
+        def create_strategies(self):
+            return [failed, building, ready]
+    manager = Manager()
+    assert manager.suggest('fast_') == \
+        {'fast_sum': ['from fastlib.core import fast_sum']}
+
+
+@pytest.mark.timeout(1.0)
+def testResolveMany(ctags_fixture, mocker):
+    from vim_autoimport.managers.python import PythonImportManager
+    manager = PythonImportManager()
+    asyncio.get_event_loop().run_until_complete(
+        manager.wait_until_strategies_ready())
+
+    # it should never ask user, even if there are multiple candidates.
+    import vim_autoimport.vim_utils as vim_utils
+    ask_user = mocker.patch.object(vim_utils, 'ask_user', return_value=1)
+
+    r = manager.resolve_many(["John", "SomeClass", "os.path.exists",
+                              "_this_is_unknown"])
+    r = {k: list(map(str, v)) for (k, v) in r.items()}
+    print(r)
+    assert r["John"] == ["from names.Doe import John",
+                         "from names.Lennon import John"]
+    assert r["SomeClass"] == ["from lib2.models.some_class import SomeClass"]
+    assert r["os.path.exists"][0] == "import os.path"   # most preferred
+    assert "import os" in r["os.path.exists"]            # ancestors
+    assert r["_this_is_unknown"] == []
+    ask_user.assert_not_called()
+
+
+def testMembers(ctags_fixture):
+    from vim_autoimport.managers.python import PythonImportManager
+    manager = PythonImportManager()
+    asyncio.get_event_loop().run_until_complete(
+        manager.wait_until_strategies_ready())
+
+    # from ctags
+    assert manager.members('names') == ['Doe', 'Lennon']
+    assert manager.members('names.Doe') == ['John']
+    assert manager.members('lib2.models') == ['some_class']
+    assert manager.members('some_class') == ['SomeClass']   # via qualifier
+    assert manager.members('lib2.models.some_class', 'Some') == ['SomeClass']
+    assert manager.members('lib2.models.some_class', 'X') == []
+
+    # from the database, through aliases
+    assert manager.qualifier_packages('np.linalg') == ['np.linalg', 'numpy.linalg']
+    assert 'OrderedDict' in manager.members('collections', 'Ord')
+    assert manager.members('typing', 'Opt') == ['Optional']
+    assert manager.members('torch') == ['nn']
+    assert manager.members('_unknown') == []
+
+
+def testFindUnresolvedSymbols():
+    from vim_autoimport.managers.python import PythonImportManager
+    manager = PythonImportManager()
+    lines = """\
+import os
+from typing import List as L
+
+def foo(x: L[int], *args):
+    y = np.linalg.norm(x) + len(args)
+    for k in range(y):
+        print(os.path.join(k), __file__)
+    return OrderedDict(z=foo(y), w=np.zeros)
+
+class Bar:
+    pass
+
+try:
+    Bar(); undefined()
+except ValueError as e:
+    print(e)
+""".split('\n')
+    assert manager.find_unresolved_symbols(lines) == [
+        ("np.linalg.norm", 5),
+        ("OrderedDict", 8),
+        ("np.zeros", 8),
+        ("undefined", 14),
+    ]
+    # code with syntax errors, e.g. while editing
+    assert manager.find_unresolved_symbols(["def foo(:"]) == []
+    # any name can be defined by `import *`
+    assert manager.find_unresolved_symbols(lines + ["from os.path import *"]) == []
+
+
+def testResolveUnambiguous(ctags_fixture):
+    from vim_autoimport.managers.python import PythonImportManager
+    manager = PythonImportManager()
+    asyncio.get_event_loop().run_until_complete(
+        manager.wait_until_strategies_ready())
+
+    assert manager.resolve_unambiguous("np.zeros") == "import numpy as np"
+    assert manager.resolve_unambiguous("SomeClass") == \
+        "from lib2.models.some_class import SomeClass"
+    assert manager.resolve_unambiguous("John") is None  # ambiguous
+    assert manager.resolve_unambiguous("_this_is_unknown") is None
+
+
 @pytest.mark.timeout(10.0)
 @pytest.mark.skipif('not config.getvalue("all")',
                     reason="Do not run slow tests unless --all was specified")
@@ -228,16 +800,19 @@ def testCTagsReal():
 def testListAndSuggest(mocker):
     from vim_autoimport.managers.python import PythonImportManager
     from vim_autoimport.managers.python import SitePackagesCTagsStrategy
+    from vim_autoimport.managers.python import BuiltinCTagsStrategy
     async def null_ctags():
         yield ''  # yield an empty line, disable site-packages strategy
     mocker.patch.object(SitePackagesCTagsStrategy, '_run_ctags',
-                        side_effect=lambda: _wrap_as_future(null_ctags()))
+                        side_effect=lambda: null_ctags())
     manager = PythonImportManager()
 
     # await manager
     asyncio.get_event_loop().run_until_complete(manager.wait_until_strategies_ready())
 
-    assert len(manager._strategies[2]._tags) > 5000   # builtin strategy?
+    builtin = [s for s in manager._strategies
+               if isinstance(s, BuiltinCTagsStrategy)][0]
+    assert len(builtin._tags) > 5000
     assert len(manager.list_all()) > 0
 
     assert set(manager.suggest("datetime")['datetime']) == set([
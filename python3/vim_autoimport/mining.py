@@ -0,0 +1,167 @@
+"""Counting of import statements in source files (see conventions.py).
+
+This module must not depend on vim (nor the rest of the package), since it
+is also run by worker subprocesses, in a plain python interpreter:
+
+    python -m vim_autoimport.mining < filenames.json > table.json
+"""
+
+import ast
+import json
+import os
+import sys
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, TypeVar
+
+T = TypeVar('T')
+
+# A candidate is picked automatically if it was seen at least MIN_COUNT times,
+# and accounts for at least DOMINANCE of all the (known) usages of the name.
+MIN_COUNT = 2
+DOMINANCE = 0.8
+
+
+class ConventionTable:
+    """A frequency table of import statements.
+
+    names:  bound name -> {import statement -> count}
+    styles: module -> {'from': count, 'import': count}
+    """
+
+    def __init__(self):
+        self.names: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.styles: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.files = 0
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name: str, statement: str, module: str, style: str):
+        counts = self.names[name]
+        counts[statement] = counts.get(statement, 0) + 1
+        self.styles[module][style] = self.styles[module].get(style, 0) + 1
+
+    def merge(self, other: 'ConventionTable'):
+        for name, counts in other.names.items():
+            for statement, n in counts.items():
+                self.names[name][statement] = self.names[name].get(statement, 0) + n
+        for module, styles in other.styles.items():
+            for style, n in styles.items():
+                self.styles[module][style] = self.styles[module].get(style, 0) + n
+        self.files += other.files
+
+    def count(self, name: str, statement: str) -> int:
+        return self.names.get(name, {}).get(statement, 0)
+
+    def style_count(self, statement: str) -> int:
+        """How often the module is imported in the same style as the statement."""
+        words = statement.split()   # from {module} ..., import {module} ...
+        module, style = words[1], words[0]
+        return self.styles.get(module, {}).get(style, 0)
+
+    def rank(self, name: str, candidates: List[T],
+             key: Callable[[T], str] = str) -> List[T]:
+        """Sort candidates (stably) by how often they were used for the name,
+        and then by how often the module is imported in that style."""
+        if name not in self.names and not self.styles:
+            return list(candidates)
+        return sorted(candidates, key=lambda c: (
+            -self.count(name, key(c)), -self.style_count(key(c))))
+
+    def dominant(self, name: str,
+                 statements: Optional[Iterable[str]] = None) -> Optional[str]:
+        """The import statement (among the given ones, or all the learned
+        ones) that is dominantly used for the name, or None if ambiguous."""
+        counts = self.names.get(name)
+        if not counts:
+            return None
+        if statements is not None:
+            counts = {s: counts.get(s, 0) for s in statements}
+        total = sum(counts.values())
+        if not total:
+            return None
+        best = max(counts, key=lambda s: counts[s])
+        if counts[best] >= MIN_COUNT and counts[best] >= DOMINANCE * total:
+            return best
+        return None
+
+    def as_dict(self) -> Dict:
+        return {'names': self.names, 'styles': self.styles, 'files': self.files}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ConventionTable':
+        """The inverse of as_dict()."""
+        table = cls()
+        table.names.update(data.get('names', {}))
+        table.styles.update(data.get('styles', {}))
+        table.files = data.get('files', 0)
+        return table
+
+    @classmethod
+    def load(cls, path: str) -> 'ConventionTable':
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls()
+        return cls.from_dict(data)
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.as_dict(), f)
+        os.replace(tmp, path)   # atomic
+
+
+def mine_source(source: str, table: ConventionTable):
+    """Count the import statements in the source code."""
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError, SystemError, RecursionError):
+        return
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                statement = 'import ' + alias.name
+                if alias.asname:
+                    statement += ' as ' + alias.asname
+                table.add(alias.asname or alias.name, statement,
+                          alias.name, 'import')
+        elif isinstance(node, ast.ImportFrom):
+            if node.level or not node.module or node.module == '__future__':
+                continue  # relative imports are local to the project
+            for alias in node.names:
+                if alias.name == '*':
+                    continue
+                statement = 'from {} import {}'.format(node.module, alias.name)
+                if alias.asname:
+                    statement += ' as ' + alias.asname
+                table.add(alias.asname or alias.name, statement,
+                          node.module, 'from')
+
+
+def mine_files(filenames: List[str]) -> ConventionTable:
+    """Count the import statements in the files (run in worker processes)."""
+    table = ConventionTable()
+    for filename in filenames:
+        try:
+            with open(filename, encoding='utf-8', errors='ignore') as f:
+                source = f.read()
+        except OSError:
+            continue
+        if 'import' in source:
+            mine_source(source, table)
+        table.files += 1
+    return table
+
+
+def main():
+    """The entry point of workers: mine the files (a JSON list in stdin), and
+    write the table (as JSON) to stdout."""
+    filenames: List[str] = json.load(sys.stdin)
+    json.dump(mine_files(filenames).as_dict(), sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
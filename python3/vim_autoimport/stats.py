@@ -0,0 +1,243 @@
+"""Performance instrumentation: timers, counters and trace logs.
+
+Usage:
+
+    @stats.timed('resolve_import')
+    def resolve_import(self, symbol): ...
+
+    stats.cache_access('precomputed', hit=True)
+    stats.record_index('SitePackagesCTagsStrategy', build_time=1.2, ...)
+    stats.as_dict()    # also available as :AutoImportStats
+"""
+
+import collections
+import functools
+import itertools
+import sys
+import threading
+import time
+from typing import (Any, Callable, Deque, Dict, Iterable, List, Optional,
+                    TypeVar)
+
+
+_F = TypeVar('_F', bound=Callable[..., Any])
+
+
+class Histogram:
+    """A latency histogram (in milliseconds) with exponential buckets.
+    Percentiles are estimated from the most recent samples."""
+
+    BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+    MAX_SAMPLES = 1024
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets: List[int] = [0] * (len(self.BUCKETS) + 1)
+        self.samples: Deque[float] = collections.deque(maxlen=self.MAX_SAMPLES)
+
+    def add(self, value_ms: float):
+        self.count += 1
+        self.total += value_ms
+        self.max = max(self.max, value_ms)
+        self.samples.append(value_ms)
+        for i, upper in enumerate(self.BUCKETS):
+            if value_ms <= upper:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def percentile(self, p: float) -> float:
+        if not self.samples:
+            return 0.0
+        samples = sorted(self.samples)
+        return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+    def as_dict(self) -> Dict[str, Any]:
+        labels = ['<={}ms'.format(b) for b in self.BUCKETS] + \
+            ['>{}ms'.format(self.BUCKETS[-1])]
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max,
+            'buckets': {l: n for (l, n) in zip(labels, self.buckets) if n},
+        }
+
+
+class _Operation:
+    """Statistics of an instrumented operation."""
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.rpcs = 0       # total number of vim RPCs
+        self.max_rpcs = 0   # max number of vim RPCs in a single call
+
+    def as_dict(self) -> Dict[str, Any]:
+        d = self.latency.as_dict()
+        d['rpcs'] = self.rpcs
+        d['rpcs_per_call'] = self.rpcs / d['count'] if d['count'] else 0.0
+        d['max_rpcs'] = self.max_rpcs
+        return d
+
+
+_lock = threading.Lock()
+_local = threading.local()    # stack of the active operations
+
+OPERATIONS: Dict[str, _Operation] = collections.defaultdict(_Operation)
+CACHES: Dict[str, Dict[str, int]] = collections.defaultdict(
+    lambda: {'hits': 0, 'misses': 0})
+INDEXES: Dict[str, Dict[str, Any]] = {}
+RPCS: Dict[str, int] = collections.defaultdict(int)   # by vim function
+
+_trace_log = None
+
+
+def _active_frames() -> List[Dict[str, Any]]:
+    if not hasattr(_local, 'frames'):
+        _local.frames = []
+    return _local.frames
+
+
+class timed:
+    """A context manager (or a decorator) that measures the latency and the
+    number of vim RPCs of an operation. RPCs made in nested operations are
+    accounted to all the enclosing operations as well."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        frame = {'name': self.name, 'rpcs': 0, 't0': time.perf_counter()}
+        _active_frames().append(frame)
+        return frame
+
+    def __exit__(self, *exc_info):
+        frame = _active_frames().pop()
+        elapsed_ms = (time.perf_counter() - frame['t0']) * 1000.0
+        with _lock:
+            op = OPERATIONS[self.name]
+            op.latency.add(elapsed_ms)
+            op.rpcs += frame['rpcs']
+            op.max_rpcs = max(op.max_rpcs, frame['rpcs'])
+        trace('operation', name=self.name, duration_ms=elapsed_ms,
+              rpcs=frame['rpcs'], error=exc_info[0] is not None)
+        return False
+
+    def __call__(self, fn: _F) -> _F:
+        @functools.wraps(fn)
+        def _wrapped(*args, **kwargs):
+            with timed(self.name):
+                return fn(*args, **kwargs)
+        return _wrapped  # type: ignore
+
+
+def record_rpc(name: str):
+    """Record a vim RPC (e.g. a function call) made by the python host."""
+    for frame in _active_frames():
+        frame['rpcs'] += 1
+    with _lock:
+        RPCS[name] += 1
+
+
+def cache_access(name: str, hit: bool):
+    with _lock:
+        CACHES[name]['hits' if hit else 'misses'] += 1
+
+
+def record_index(name: str, **info: Any):
+    """Record the information of an index, e.g. build_time (in seconds),
+    number of symbols, estimated memory (in bytes), etc."""
+    with _lock:
+        INDEXES[name] = dict(info)
+    trace('index', name=name, **info)
+
+
+def estimate_size(obj: Any, sample: int = 1000, _depth: int = 0) -> int:
+    """A rough estimate of memory usage (in bytes) of a container, including
+    its (nested) elements but without deduplicating shared objects.
+    Only `sample` elements of a large container are measured (and scaled),
+    so that it is cheap even for an index of millions of symbols."""
+    size = sys.getsizeof(obj)
+    if _depth > 3:
+        return size
+    if isinstance(obj, dict):
+        elements: Iterable[Any] = itertools.chain.from_iterable(obj.items())
+        n = 2 * len(obj)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        elements, n = obj, len(obj)
+    else:
+        return size
+    measured = [estimate_size(e, sample, _depth + 1)
+                for e in itertools.islice(elements, 2 * sample)]
+    if measured:
+        size += int(sum(measured) * n / len(measured))
+    return size
+
+
+def as_dict() -> Dict[str, Any]:
+    with _lock:
+        return {
+            'operations': {k: op.as_dict() for (k, op) in OPERATIONS.items()},
+            'caches': {k: dict(v, hit_rate=(v['hits'] / (v['hits'] + v['misses'])
+                                            if v['hits'] + v['misses'] else 0.0))
+                       for (k, v) in CACHES.items()},
+            'indexes': {k: dict(v) for (k, v) in INDEXES.items()},
+            'rpcs': dict(RPCS),
+        }
+
+
+def format_lines() -> List[str]:
+    """Human-readable summary of the statistics, for :AutoImportStats."""
+    d = as_dict()
+    lines = ['Indexes:']
+    for name, info in sorted(d['indexes'].items()):
+        lines.append('  {:<30s} {}'.format(name, ', '.join(
+            '{}={}'.format(k, round(v, 3) if isinstance(v, float) else v)
+            for (k, v) in sorted(info.items()))))
+    lines.append('Operations:')
+    for name, op in sorted(d['operations'].items()):
+        lines.append(
+            '  {:<30s} n={count} mean={mean:.1f}ms p50={p50:.1f}ms '
+            'p99={p99:.1f}ms max={max:.1f}ms rpcs/call={rpcs_per_call:.1f}'
+            .format(name, **op))
+    lines.append('Caches:')
+    for name, c in sorted(d['caches'].items()):
+        lines.append('  {:<30s} hits={hits} misses={misses} '
+                     'hit_rate={hit_rate:.1%}'.format(name, **c))
+    lines.append('RPCs:')
+    for name, n in sorted(d['rpcs'].items(), key=lambda kv: -kv[1]):
+        lines.append('  {:<30s} {}'.format(name, n))
+    return lines
+
+
+def reset():
+    with _lock:
+        OPERATIONS.clear()
+        CACHES.clear()
+        INDEXES.clear()
+        RPCS.clear()
+
+
+def set_trace_log(path: Optional[str]):
+    """Write all events as JSON lines to the file (None to disable)."""
+    global _trace_log
+    with _lock:
+        if _trace_log is not None:
+            _trace_log.close()
+        _trace_log = open(path, 'a') if path else None
+
+
+def trace(event: str, **data: Any):
+    if _trace_log is None:
+        return
+    import json   # lazily, as tracing is off by default
+    line = json.dumps(dict(data, event=event, time=time.time()), default=str)
+    with _lock:
+        if _trace_log is not None:
+            _trace_log.write(line + '\n')
+            _trace_log.flush()
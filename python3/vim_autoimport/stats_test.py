@@ -0,0 +1,91 @@
+import json
+import sys
+
+import pytest
+
+from vim_autoimport import stats
+
+
+@pytest.fixture(autouse=True)
+def reset_stats():
+    stats.reset()
+    yield
+    stats.reset()
+    stats.set_trace_log(None)
+
+
+def testTimedAndRPCs():
+    @stats.timed('outer')
+    def outer():
+        stats.record_rpc('line')
+        with stats.timed('inner'):
+            stats.record_rpc('search')
+            stats.record_rpc('search')
+        return 42
+
+    assert outer() == 42
+    assert outer() == 42
+    stats.record_rpc('getbufvar')   # not in any operation
+
+    d = stats.as_dict()
+    print(d)
+    assert d['operations']['outer']['count'] == 2
+    assert d['operations']['outer']['rpcs'] == 6   # nested RPCs included
+    assert d['operations']['outer']['rpcs_per_call'] == 3
+    assert d['operations']['inner']['rpcs'] == 4
+    assert d['operations']['inner']['max_rpcs'] == 2
+    assert d['rpcs'] == {'line': 2, 'search': 4, 'getbufvar': 1}
+
+
+def testHistogram():
+    h = stats.Histogram()
+    for v in range(1, 101):
+        h.add(float(v))
+    d = h.as_dict()
+    assert d['count'] == 100
+    assert d['mean'] == 50.5
+    assert d['p50'] == 51 and d['p99'] == 100 and d['max'] == 100
+    assert d['buckets']['<=1ms'] == 1
+    assert d['buckets']['<=100ms'] == 50
+
+
+def testCachesAndIndexes():
+    stats.cache_access('precomputed', hit=True)
+    stats.cache_access('precomputed', hit=False)
+    stats.cache_access('precomputed', hit=True)
+    stats.record_index('DB', build_time=0.5, symbols=10,
+                       memory=stats.estimate_size({'a': [1, 2]}))
+
+    d = stats.as_dict()
+    assert d['caches']['precomputed']['hit_rate'] == pytest.approx(2 / 3)
+    assert d['indexes']['DB']['symbols'] == 10
+    assert d['indexes']['DB']['memory'] > 0
+    assert any('DB' in line for line in stats.format_lines())
+
+
+def testEstimateSize():
+    small = {'a': [1, 2]}
+    assert stats.estimate_size(small) == stats.estimate_size(small, sample=1)
+
+    # large containers are sampled, but estimated roughly the same
+    large = {'sym{}'.format(i): [i, i + 1] for i in range(100000)}
+    exact = stats.estimate_size(large, sample=len(large))
+    assert stats.estimate_size(large) == pytest.approx(exact, rel=0.05)
+
+
+def testTraceLog(tmp_path):
+    path = tmp_path / 'trace.jsonl'
+    stats.set_trace_log(str(path))
+    with stats.timed('resolve_import'):
+        pass
+    stats.set_trace_log(None)
+
+    events = [json.loads(l) for l in path.read_text().splitlines()]
+    assert len(events) == 1
+    assert events[0]['event'] == 'operation'
+    assert events[0]['name'] == 'resolve_import'
+    assert events[0]['duration_ms'] >= 0
+
+
+if __name__ == '__main__':
+    pytest.main(["-s", "-v"] + sys.argv)
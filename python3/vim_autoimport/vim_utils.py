@@ -1,10 +1,13 @@
 """Vim-related utilities."""
 
 import vim
+import os
 import sys
 import functools
 import traceback
-from typing import Optional
+from typing import Any, Optional
+
+from . import stats
 
 
 # Whether the python host is neovim or vanilla vim.
@@ -16,15 +19,22 @@ is_treesitter_supported: bool = is_neovim and vim.funcs.has('nvim-0.9') > 0
 
 def funcref_nvim(name: str):
     '''Wrap a nvim function.'''
-    return functools.partial(vim.call, name)
+    call = functools.partial(vim.call, name)
+
+    def _funcref(*args, **kwargs):
+        stats.record_rpc(name)
+        return call(*args, **kwargs)
+    return _funcref
 
 
 class VimFunctionWrapper:
     '''Wrap a vim function (vim.Function)'''
     def __init__(self, name: str):
+        self._name = name
         self._fn = vim.Function(name)
 
     def __call__(self, *args, **kwargs):
+        stats.record_rpc(self._name)
         ret = self._fn(*args, **kwargs)
         if isinstance(ret, bytes):
             # for string return values, need to decode to str
@@ -41,6 +51,87 @@ else:
     funcref = funcref_nvim
 
 
+class _RecordingBuffer:
+    '''A buffer, whose lines are read by RPCs under neovim (an iteration or
+    a slice fetches the lines at once).'''
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+
+    @property
+    def number(self) -> int:
+        return self._buffer.number
+
+    def __getitem__(self, index):
+        stats.record_rpc('buffer[]')
+        return self._buffer[index]
+
+    def __iter__(self):
+        stats.record_rpc('buffer[]')
+        return iter(self._buffer[:])
+
+    def __len__(self):
+        stats.record_rpc('len(buffer)')
+        return len(self._buffer)
+
+
+class _RecordingCurrent:
+    @property
+    def buffer(self) -> _RecordingBuffer:
+        stats.record_rpc('current.buffer')   # nvim_get_current_buf
+        return _RecordingBuffer(vim.current.buffer)
+
+
+class _RecordingHost:
+    '''The `vim` module, recording every call to the host (a RPC under
+    neovim) in stats, at the same layer as test/fakevim.py does. Function
+    calls are recorded by funcref().'''
+
+    current = _RecordingCurrent()
+
+    def eval(self, expr: str) -> Any:
+        stats.record_rpc('eval')
+        return vim.eval(expr)
+
+    def command(self, cmd: str) -> None:
+        stats.record_rpc('command')
+        vim.command(cmd)
+
+    def exec_lua(self, code: str, *args) -> Any:
+        stats.record_rpc('exec_lua')
+        return vim.exec_lua(code, *args)
+
+    @property
+    def vars(self):
+        stats.record_rpc('vars')
+        return vim.vars
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(vim, name)
+
+
+# Use `from .vim_utils import host as vim` rather than `import vim`.
+host = _RecordingHost()
+
+
+def get_option(name: str, default: Any = None) -> Any:
+    """Get the value of g:autoimport_{name}, or default if not set."""
+    try:
+        value = host.vars.get('autoimport_' + name, default)
+    except AttributeError:
+        return default  # maybe in mock/unittest?
+    if isinstance(value, bytes):
+        return value.decode('utf8')
+    return value
+
+
+def default_cache_path(filename: str) -> str:
+    """A path to the file in the cache directory, ~/.cache/vim-autoimport."""
+    cache_home = os.environ.get('XDG_CACHE_HOME') or \
+        os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'vim-autoimport', filename)
+
+
 def echomsg(msg: str, hlgroup=None):
     """Execute vim's echomsg synchronously."""
     try:
@@ -72,8 +163,8 @@ def ask_user(items) -> Optional[int]:
     items = ["[%2d] " % i + item
              for i, item in enumerate(items, start=1)]
     try:
-        rv = vim.eval("inputlist(%s)" % items)    # TODO: escape properly
-        vim.command('echo " "')
+        rv = host.eval("inputlist(%s)" % items)    # TODO: escape properly
+        host.command('echo " "')
         rv = int(rv) if (rv and rv != "0") else None
         return rv
     except Exception as e:
@@ -44,11 +44,27 @@ exports.activate = async (context) => {
     priority: 5,
     filetypes: ['python'],
     firstMatch: false,
+    triggerCharacters: ['.'],
     doComplete: async function (opt) {
-      const { input } = opt;  // opt: CompleteOption
+      const { input, line, col } = opt;  // opt: CompleteOption
       var items = [];  // :help complete-items
 
       logger.info(`input = ${input}`);
+
+      // `qualifier.input`, e.g. np.lin -> members of numpy
+      const m = line.slice(0, col).match(/([A-Za-z_][\w.]*)\.$/);
+      if (m) {
+        const qualifier = m[1];
+        const members = await nvim.call('autoimport#members', [qualifier, input]);
+        members.forEach(member => {
+          items.push({  // VimCompleteItem
+            word: member, menu: `[${shortcut}] ${qualifier}`,
+            data: { symbol: `${qualifier}.${member}` },
+          });
+        });
+        return { items };
+      }
+
       if (input.length < 1)
         return { items };
 
@@ -74,13 +90,21 @@ exports.activate = async (context) => {
     onCompleteDone: async function (item, opt) {
       // When completion is accepted, we autoimport the symbol.
       // item: VimCompleteItem, opt: CompleteOption
-      nvim.command(`ImportSymbol ${item.word}`);
+      const symbol = (item.data && item.data.symbol) || item.word;
+      nvim.command(`ImportSymbol ${symbol}`);
     },
-
-    // TODO: For `somepackage.someMethod`, `somepackage` should work as a qualifier
-    //   e.g. tensorflow.Optimizer or tf.Optimizer => should rule out homonyms from other packages
-    // TODO: make the completion continue after "dot"
   };
 
   context.subscriptions.push(sources.createSource(source));
+
+  /**
+   * Resolve import candidates for a list of symbols with a single RPC.
+   * Returns { symbol: [import statements] }, ranked by preference.
+   */
+  async function resolveMany(symbols) {
+    return await nvim.call('autoimport#resolve_many', [symbols]);
+  }
+
+  // Public API for other extensions: extensions.getExtensionApi('vim-autoimport')
+  return { resolveMany };
 };
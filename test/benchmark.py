@@ -0,0 +1,284 @@
+"""A reproducible benchmark suite for vim-autoimport.
+
+It generates a synthetic site-packages tree of configurable size, and
+measures the import time of the plugin, the cold index build (ctags, or
+synthesized ctags output if ctags is not installed), warm start, peak memory,
+and latency of resolve_import(), suggest() and add_import() against a fake
+in-memory buffer.
+Results are reported as JSON so that runs can be compared:
+
+    python test/benchmark.py --packages 50 --output before.json
+    python test/benchmark.py --packages 50 --compare before.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'python3'))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import fakevim  # noqa: E402
+vim = fakevim.install()
+
+from vim_autoimport import vim_utils  # noqa: E402
+from vim_autoimport.managers import python as py  # noqa: E402
+
+
+# -----------------------------------------------------------------------------
+# Synthetic site-packages generator
+
+def generate_site_packages(root: Path, packages: int = 20, depth: int = 2,
+                           modules: int = 5, symbols: int = 20,
+                           duplicates: float = 0.05, seed: int = 0,
+                           ) -> Dict[str, Any]:
+    """Generate a tree of `packages` top-level packages, each nested `depth`
+    levels deep with `modules` modules per (sub)package, and `symbols`
+    functions/classes per module. A `duplicates` fraction of symbols share
+    names across modules (which would be ambiguous to resolve)."""
+    rng = random.Random(seed)
+    num_files = num_symbols = 0
+    for p in range(packages):
+        pkgdirs = [root / 'synth_pkg{:03d}'.format(p)]
+        for d in range(1, depth):
+            pkgdirs.append(pkgdirs[-1] / 'sub{}'.format(d))
+        for pkgdir in pkgdirs:
+            pkgdir.mkdir(parents=True, exist_ok=True)
+            (pkgdir / '__init__.py').write_text('')
+            for m in range(modules):
+                lines = []
+                for s in range(symbols):
+                    if rng.random() < duplicates:
+                        name = 'Common{}'.format(rng.randrange(100))
+                    else:
+                        name = 'Sym_{}_{}_{}_{}'.format(p, len(pkgdir.parts), m, s)
+                    if s % 2:
+                        lines += ['class {}:'.format(name), '    pass', '']
+                    else:
+                        lines += ['def {}():'.format(name.lower()), '    pass', '']
+                    num_symbols += 1
+                (pkgdir / 'module{}.py'.format(m)).write_text('\n'.join(lines))
+                num_files += 1
+    return {'files': num_files, 'symbols': num_symbols}
+
+
+def synthesize_ctags(root: Path) -> Iterator[str]:
+    """Emulate the output of `ctags -f - -R .` for the generated tree."""
+    pattern = re.compile(r'^(def|class) (\w+)')
+    for dirpath, _, filenames in sorted(os.walk(root)):
+        for filename in sorted(filenames):
+            path = Path(dirpath) / filename
+            relpath = path.relative_to(root).as_posix()
+            for line in path.read_text().splitlines():
+                m = pattern.match(line)
+                if m:
+                    kind = 'f' if m.group(1) == 'def' else 'c'
+                    yield '\t'.join([m.group(2), relpath,
+                                     '/^{}$/;"'.format(line), kind])
+
+
+class SyntheticCTagsStrategy(py.CTagsStrategy):
+    """Index the synthetic tree, with real ctags if available."""
+    lib_directory = ''
+    use_real_ctags = False
+
+    async def _run_ctags(self):
+        if self.use_real_ctags:
+            return await super()._run_ctags()
+
+        async def _lines():
+            for line in synthesize_ctags(Path(self.lib_directory)):
+                yield line
+        return _lines()
+
+
+class BenchmarkManager(py.PythonImportManager):
+    def create_strategies(self):
+        return [py.DBLookupStrategy(), py.ImportableModuleStrategy(),
+                SyntheticCTagsStrategy(is_async=False)]
+
+
+# -----------------------------------------------------------------------------
+# Measurements
+
+def _summarize(samples_sec: List[float]) -> Dict[str, float]:
+    samples = sorted(s * 1000.0 for s in samples_sec)  # in ms
+    def percentile(p):
+        return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+    return {'n': len(samples), 'mean_ms': statistics.mean(samples),
+            'p50_ms': percentile(50), 'p99_ms': percentile(99),
+            'max_ms': samples[-1]}
+
+
+def _timeit(fn, args_list) -> Dict[str, float]:
+    samples = []
+    for args in args_list:
+        t0 = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - t0)
+    return _summarize(samples)
+
+
+def measure_import_time(top: int = 5) -> Dict[str, Any]:
+    """Measure the cost of importing the plugin (in a fresh interpreter) with
+    `python -X importtime`: cumulative time of the package and the python
+    manager, and the modules that take the most time by themselves."""
+    script = '; '.join([
+        'import sys', 'sys.modules["vim"] = type(sys)("vim")',
+        'sys.path.insert(0, {!r})'.format(str(ROOT / 'python3')),
+        'import vim_autoimport', 'import vim_autoimport.managers.python'])
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', script],
+                          stderr=subprocess.PIPE, check=True)
+    self_us: Dict[str, int] = {}
+    cumulative_us: Dict[str, int] = {}
+    for line in proc.stderr.decode().splitlines():
+        # import time: self [us] | cumulative | imported package
+        fields = line.partition('import time:')[2].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        name = fields[2].strip()
+        self_us[name], cumulative_us[name] = int(fields[0]), int(fields[1])
+    return {
+        'package_ms': cumulative_us.get('vim_autoimport', 0) / 1000.0,
+        'python_manager_ms':
+            cumulative_us.get('vim_autoimport.managers.python', 0) / 1000.0,
+        'top_self_ms': {name: self_us[name] / 1000.0 for name in
+                        sorted(self_us, key=self_us.get, reverse=True)[:top]},
+    }
+
+
+def run_benchmark(args) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    results: Dict[str, Any] = {'import_time': measure_import_time()}
+    vim_utils.ask_user = lambda items: 1   # always choose the first one
+
+    with tempfile.TemporaryDirectory(prefix='autoimport-bench-') as tmpdir:
+        root = Path(tmpdir)
+        results['tree'] = generate_site_packages(
+            root, packages=args.packages, depth=args.depth,
+            modules=args.modules, symbols=args.symbols,
+            duplicates=args.duplicates, seed=args.seed)
+        SyntheticCTagsStrategy.lib_directory = str(root)
+        SyntheticCTagsStrategy.use_real_ctags = bool(
+            args.ctags and shutil.which('ctags'))
+
+        # creating a manager should be (almost) free; indexes are built lazily
+        py.DB.clear()
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        manager = BenchmarkManager()
+        results['create_manager_sec'] = time.perf_counter() - t0
+
+        # cold index build (including the python database), at idle time
+        manager.warm_up()
+        results['cold_index_build_sec'] = time.perf_counter() - t0
+        results['peak_memory_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        tags = manager._strategies[-1]._tags
+        results['index_size'] = len(tags)
+
+        # warm start: a new manager, which reuses the python database and
+        # the index built by the first one (rather than running ctags again)
+        t0 = time.perf_counter()
+        BenchmarkManager().warm_up()
+        results['warm_start_sec'] = time.perf_counter() - t0
+
+        keys = sorted(tags.keys())
+        queries = [rng.choice(keys) for _ in range(args.queries)]
+        results['resolve_import'] = _timeit(
+            manager.resolve_import, [(q,) for q in queries])
+        results['resolve_import_miss'] = _timeit(
+            manager.resolve_import,
+            [('unknown{}.attr'.format(i),) for i in range(args.queries)])
+        results['suggest'] = _timeit(
+            manager.suggest, [(q[:rng.randint(1, 4)],) for q in queries[:100]])
+        modules = [k for k in keys if k.startswith('synth_pkg')]
+        results['members'] = _timeit(
+            manager.members, [(rng.choice(modules), rng.choice(['', 'S', 'sym_']))
+                              for _ in range(args.queries)])
+
+        # add_import against a fake buffer of a typical python file
+        buffer = ['"""Module docstring."""', '', 'import os', 'import sys', '']
+        buffer += ['x_{} = os.path.join("a", "b")'.format(i)
+                   for i in range(args.buffer_lines)]
+        statements = [str(manager.resolve_many([q])[q][0]) for q in queries[:100]]
+        def add_import(statement):
+            vim.set_lines(buffer)
+            manager.add_import(statement)
+        results['add_import'] = _timeit(add_import, [(s,) for s in statements])
+
+    return results
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Compare numeric results against a baseline, as ratios (current/base)."""
+    lines = []
+    def _walk(cur, base, prefix=''):
+        for k, v in cur.items():
+            if k not in base:
+                continue
+            if isinstance(v, dict):
+                _walk(v, base[k], prefix + k + '.')
+            elif isinstance(v, (int, float)) and base[k]:
+                lines.append('{:<40s} {:>12.4g} -> {:>12.4g}  ({:.2f}x)'.format(
+                    prefix + k, base[k], v, v / base[k]))
+    _walk(current['results'], baseline['results'])
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--packages', type=int, default=20)
+    parser.add_argument('--depth', type=int, default=2)
+    parser.add_argument('--modules', type=int, default=5,
+                        help='number of modules per (sub)package')
+    parser.add_argument('--symbols', type=int, default=20,
+                        help='number of symbols per module')
+    parser.add_argument('--duplicates', type=float, default=0.05,
+                        help='fraction of symbols with duplicated names')
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--buffer-lines', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--ctags', action='store_true',
+                        help='use real ctags (if installed) rather than synthesized output')
+    parser.add_argument('--output', help='write results as JSON to the file')
+    parser.add_argument('--compare', help='compare against a previous JSON result')
+    args = parser.parse_args()
+
+    report = {
+        'config': {k: v for (k, v) in vars(args).items()
+                   if k not in ('output', 'compare')},
+        'environment': {
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'ctags': bool(args.ctags and shutil.which('ctags')),
+        },
+        'results': run_benchmark(args),
+    }
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        Path(args.output).write_text(text + '\n')
+    else:
+        print(text)
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        print('\n'.join(compare(report, baseline)), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
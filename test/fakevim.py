@@ -0,0 +1,203 @@
+"""A fake (neovim-like) `vim` module backed by an in-memory buffer.
+
+It implements only what vim_autoimport needs: the current buffer, cursor,
+a handful of vim functions (via `vim.call`/`vim.funcs`) and a naive python
+syntax highlighting for synID(). Install it before importing vim_autoimport:
+
+    import fakevim
+    vim = fakevim.install(lines=["import os", "", "os.path"])
+
+Every call to the host (which would be a RPC under neovim's msgpack host)
+is recorded in `vim.calls`, e.g. ('call', 'search') or ('buffer', '__len__'),
+so that tests can assert the number of round-trips per operation.
+"""
+
+import re
+import sys
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class FakeBuffer:
+    """The current buffer. Accessing lines is recorded as a host call, like
+    pynvim's Buffer where each of them is a RPC (iteration fetches all lines
+    at once). The fake vim functions access `lines` directly."""
+
+    def __init__(self, lines=(), number: int = 1, name: str = 'test.py',
+                 record: Callable[..., None] = lambda *call: None):
+        self.lines: List[str] = list(lines)
+        self.number = number
+        self.name = name
+        self.changedtick = 1
+        self._record = record
+
+    def __getitem__(self, index):
+        self._record('buffer', '__getitem__')
+        return self.lines[index]
+
+    def __iter__(self):
+        self._record('buffer', '__iter__')
+        return iter(list(self.lines))
+
+    def __len__(self):
+        self._record('buffer', '__len__')
+        return len(self.lines)
+
+
+class _Funcs:
+    def __init__(self, vim: 'FakeVim'):
+        self._vim = vim
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        return lambda *args: self._vim.call(name, *args)
+
+
+class FakeVim:
+    """The fake `vim` module, pretending to be the neovim python host."""
+
+    SYNTAX_GROUPS = {1: 'pythonComment', 2: 'pythonString'}
+
+    def __init__(self, lines=()):
+        self.calls: List[Tuple[str, ...]] = []
+        self.current = _Current(self, FakeBuffer(lines, record=self._record))
+        self.funcs = _Funcs(self)
+        self.vars: Dict[str, Any] = {}
+        self.cursor_pos: Tuple[int, int] = (1, 1)
+        self.functions: Dict[str, Callable[..., Any]] = {
+            'line': self._line, 'col': self._col, 'cursor': self._cursor,
+            'search': self._search, 'append': self._append,
+            'synID': self._synID, 'synIDattr': self._synIDattr,
+            'getbufvar': self._getbufvar, 'map': self._map,
+            'has': lambda feature: 0,
+        }
+
+    @property
+    def buffer(self) -> FakeBuffer:
+        return self.current._buffer
+
+    @property
+    def lines(self) -> List[str]:
+        return self.buffer.lines
+
+    def set_lines(self, lines: List[str]):
+        self.current._buffer = FakeBuffer(lines, record=self._record)
+        self.cursor_pos = (1, 1)
+
+    # --- recording -----------------------------------------------------------
+
+    def _record(self, *call: str):
+        self.calls.append(call)
+
+    def reset_calls(self):
+        self.calls.clear()
+
+    def count_calls(self, kind: Optional[str] = None) -> int:
+        """The number of host calls so far (of the kind, e.g. 'call')."""
+        return sum(1 for c in self.calls if kind is None or c[0] == kind)
+
+    # --- python host API -----------------------------------------------------
+
+    def call(self, name: str, *args) -> Any:
+        self._record('call', name)
+        if name not in self.functions:
+            raise NotImplementedError("fakevim: function {}()".format(name))
+        return self.functions[name](*args)
+
+    def eval(self, expr: str) -> Any:
+        self._record('eval', expr)
+        if expr == 'b:changedtick':
+            return self.buffer.changedtick
+        if expr == '&filetype':
+            return 'python'
+        if expr.startswith('g:'):
+            return self.vars[expr[2:]]
+        raise NotImplementedError("fakevim: eval({})".format(expr))
+
+    def command(self, cmd: str):
+        self._record('command', cmd)
+
+    # --- vim functions -------------------------------------------------------
+
+    def _line(self, expr: str) -> int:
+        if expr == '.':
+            return self.cursor_pos[0]
+        if expr == '$':
+            return len(self.lines)
+        raise NotImplementedError("fakevim: line({})".format(expr))
+
+    def _col(self, expr: str) -> int:
+        if expr == '.':
+            return self.cursor_pos[1]
+        raise NotImplementedError("fakevim: col({})".format(expr))
+
+    def _cursor(self, lnum: int, col: int) -> int:
+        lnum = max(1, min(lnum, len(self.lines)))
+        self.cursor_pos = (lnum, max(1, col))
+        return 0
+
+    def _search(self, pattern: str, flags: str = '', stopline: int = 0) -> int:
+        # Only supports very magic (\v) patterns that are python-compatible,
+        # searching forward from the cursor line (inclusive) without wrapping.
+        regex = re.compile(pattern[2:] if pattern.startswith(r'\v') else pattern)
+        start = self.cursor_pos[0]
+        end = min(len(self.lines), stopline) if stopline else len(self.lines)
+        for lnum in range(start, end + 1):
+            if regex.search(self.lines[lnum - 1]):
+                if 'n' not in flags:
+                    self.cursor_pos = (lnum, 1)
+                return lnum
+        return 0
+
+    def _append(self, lnum: int, line: str) -> int:
+        self.lines.insert(lnum, line)
+        self.buffer.changedtick += 1
+        return 0
+
+    def _synID(self, lnum: int, col: int, trans: int) -> int:
+        return self._syntax()[lnum - 1]
+
+    def _synIDattr(self, synid: int, what: str) -> str:
+        assert what == 'name'
+        return self.SYNTAX_GROUPS.get(synid, '')
+
+    def _map(self, items: List[Any], expr: str) -> List[Any]:
+        if expr == 'synIDattr(synID(v:val, 1, 1), "name")':
+            syntax = self._syntax()
+            return [self.SYNTAX_GROUPS.get(syntax[lnum - 1], '') for lnum in items]
+        raise NotImplementedError("fakevim: map(..., {})".format(expr))
+
+    def _getbufvar(self, buf: Any, varname: str) -> Any:
+        assert varname == 'changedtick'
+        return self.buffer.changedtick
+
+    def _syntax(self) -> List[int]:
+        """A naive python syntax: comments and (triple-quoted) docstrings."""
+        ids, in_docstring = [], False
+        for line in self.lines:
+            stripped = line.strip()
+            quotes = stripped.count('"""') + stripped.count("'''")
+            if in_docstring or quotes:
+                ids.append(2)
+                in_docstring = in_docstring ^ (quotes % 2 == 1)
+            elif stripped.startswith('#'):
+                ids.append(1)
+            else:
+                ids.append(0)
+        return ids
+
+
+class _Current:
+    def __init__(self, vim: FakeVim, buffer: FakeBuffer):
+        self._vim = vim
+        self._buffer = buffer
+
+    @property
+    def buffer(self) -> FakeBuffer:
+        self._vim._record('current', 'buffer')   # nvim_get_current_buf
+        return self._buffer
+
+
+def install(lines=()) -> FakeVim:
+    """Install a new fake vim as the `vim` module."""
+    vim = FakeVim(lines)
+    sys.modules['vim'] = vim  # type: ignore
+    return vim